@@ -62,6 +62,10 @@ version = release.rsplit('.', 1)[0]
 rst_prolog = """
 .. |CSV| replace:: :abbr:`CSV (Comma Separated Values)`
 .. |ISO| replace:: :abbr:`ISO (International Organization for Standardization)`
+.. |JSON| replace:: :abbr:`JSON (JavaScript Object Notation)`
+.. |NumPy| replace:: `NumPy <https://numpy.org/>`__
+.. |UTC| replace:: :abbr:`UTC (Coordinated Universal Time)`
+.. |UTF| replace:: :abbr:`UTF (Unicode Transformation Format)`
 """
 
 modindex_common_prefix = [
@@ -100,6 +104,7 @@ intersphinx_mapping = {
     for k, v in {
         'click': 'https://click.palletsprojects.com/en/7.x/',
         'jnrbase': 'https://jnrbase.readthedocs.io/en/latest/',
+        'numpy': 'https://docs.scipy.org/doc/numpy/',
         'python': 'https://docs.python.org/3/',
     }.items()
 }  # type: Dict[str, str]
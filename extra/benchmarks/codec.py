@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+"""codec - ISO-8601 codec micro-benchmarks for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from click import command, echo, option
+from jnrbase import iso_8601
+
+from rdial import codec
+
+try:
+    import cduration
+except ImportError:
+    cduration = None
+
+
+def generic_parse_datetime(string: str) -> datetime:
+    return iso_8601.parse_datetime(string).replace(tzinfo=None)
+
+
+def generic_parse_delta(string: str) -> timedelta:
+    if cduration:
+        return cduration.parse_duration(string) if string else timedelta(0)
+    return iso_8601.parse_delta(string)
+
+
+def generic_format_datetime(dt: datetime) -> str:
+    return iso_8601.format_datetime(dt) + 'Z'
+
+
+def measure(func: Callable, data: List, repeat: int) -> float:
+    timer = timeit.Timer(lambda: [func(item) for item in data])
+    return min(timer.repeat(repeat, 1)) / len(data) * 1_000_000_000
+
+
+@command()
+@option('-n', '--count', default=100_000, help='Number of rows to process.')
+@option('-r', '--repeat', default=5, help='Number of timing repeats.')
+def main(count: int, repeat: int):
+    """Compare codec against the general purpose parsers."""
+    start = datetime(2010, 1, 1, 9)
+    starts = [start + timedelta(hours=n * 7) for n in range(count)]
+    # Real databases contain relatively few distinct durations
+    deltas = [timedelta(minutes=(n * 37) % 480) for n in range(count)]
+    start_strings = [codec.format_datetime(dt) for dt in starts]
+    delta_strings = [codec.format_delta(delta) for delta in deltas]
+    for name, generic, fast, data in [
+        ('parse datetime', generic_parse_datetime, codec.parse_datetime,
+         start_strings),
+        ('parse delta', generic_parse_delta, codec.parse_delta,
+         delta_strings),
+        ('format datetime', generic_format_datetime, codec.format_datetime,
+         starts),
+        ('format delta', iso_8601.format_delta, codec.format_delta, deltas),
+    ]:
+        before = measure(generic, data, repeat)
+        after = measure(fast, data, repeat)
+        echo(f'{name + ":":16} {before:6.0f} ns/row → {after:6.0f} ns/row '
+             f'({before / after:.1f}×)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#! /usr/bin/env python3
+"""completion - Shell completion latency benchmark for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from click import command, echo, option
+
+from rdial import completion
+from rdial.cmdline import cli
+
+#: Target completion latency in milliseconds
+TARGET = 50
+
+
+def build_database(directory: str, tasks: int, rows: int) -> None:
+    """Write a database of identical tasks.
+
+    Args:
+        directory: Location to create database in
+        tasks: Number of tasks to create
+        rows: Number of events per task
+
+    """
+    for n in range(tasks):
+        with open(os.path.join(directory, f'task{n}.csv'), 'w') as f:
+            f.write('start,delta,message\n')
+            for row in range(rows):
+                f.write(f'2019-01-01T{row % 24:02d}:00:00Z,PT1H,\n')
+
+
+def startup(repeat: int) -> float:
+    """Time interpreter start up with rdial’s command line imported.
+
+    Args:
+        repeat: Number of timing repeats
+
+    Returns:
+        Fastest start up time in milliseconds
+
+    """
+    timer = timeit.Timer(lambda: subprocess.run(
+        [sys.executable, '-c', 'import rdial.cmdline'], check=True))
+    return min(timer.repeat(repeat, 1)) * 1000
+
+
+@command()
+@option('-t', '--tasks', default=500, help='Number of tasks to create.')
+@option('-n', '--rows', default=1000, help='Number of rows per task.')
+@option('-r', '--repeat', default=20, help='Number of timing repeats.')
+def main(tasks: int, rows: int, repeat: int):
+    """Measure task and wrapper name completion latency.
+
+    The target applies to the work completion performs for each request.
+    Requests made through :mod:`click`’s completion protocol also pay for
+    interpreter start up and imports, which is shared with every command and
+    is reported separately.  The zsh completion script lists task names
+    without starting :program:`rdial`.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(directory, tasks, rows)
+        config = os.path.join(directory, 'config')
+        with open(config, 'w') as f:
+            f.write('[run wrappers]\n')
+            f.writelines(f'wrapper{n} = task{n}\n' for n in range(20))
+        for name, func, args in [
+            ('tasks', completion.complete_tasks,
+             ['--directory', directory, 'start']),
+            ('wrappers', completion.complete_wrappers,
+             ['--config', config, 'wrapper']),
+        ]:
+            # Completion parses the command line afresh each time
+            timer = timeit.Timer(lambda: func(
+                cli.make_context('rdial', list(args), resilient_parsing=True),
+                'task1'))
+            elapsed = min(timer.repeat(repeat, 1)) * 1000
+            echo(f'{name + ":":10} {elapsed:6.2f} ms '
+                 f'({"within" if elapsed < TARGET else "over"} {TARGET} ms '
+                 'target)')
+    echo(f'{"startup:":10} {startup(repeat):6.2f} ms (interpreter and '
+         'imports, not included above)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+"""event_memory - Event memory footprint benchmark for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import gc
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from click import command, echo, option
+
+from rdial import codec
+from rdial.events import Events
+
+
+class DictEvent:
+    """Event with the original per-instance ``__dict__`` layout."""
+
+    def __init__(self, task: str, start: datetime, delta: timedelta,
+                 message: str) -> None:
+        self.task = task
+        self.start = start
+        self.delta = delta
+        self.message = message
+
+
+def build_database(directory: str, tasks: int, count: int) -> None:
+    """Write a database of hourly events.
+
+    Args:
+        directory: Location to create database in
+        tasks: Number of tasks to spread events over
+        count: Total number of events
+
+    """
+    start = datetime(2010, 1, 1)
+    for n in range(tasks):
+        with open(os.path.join(directory, f'task{n}.csv'), 'w') as f:
+            f.write('start,delta,message\n')
+            for row in range(n, count, tasks):
+                event_start = start + timedelta(hours=row)
+                f.write(f'{codec.format_datetime(event_start)},PT30M,\n')
+
+
+def read_dict_events(directory: str) -> List[DictEvent]:
+    """Read a database in to ``__dict__`` based events.
+
+    Args:
+        directory: Database location
+
+    Returns:
+        Events for all tasks
+
+    """
+    events = []
+    for fname in sorted(os.listdir(directory)):
+        task = fname[:-4]
+        with open(os.path.join(directory, fname)) as f:
+            for row in csv.DictReader(f):
+                events.append(
+                    DictEvent(task, codec.parse_datetime(row['start']),
+                              codec.parse_delta(row['delta']),
+                              row['message']))
+    return events
+
+
+def read_events(directory: str) -> Events:
+    """Read a database as rdial does, bypassing the cache.
+
+    Args:
+        directory: Database location
+
+    Returns:
+        Events for all tasks
+
+    """
+    return Events.read(directory, write_cache=False)
+
+
+def measure(reader: Callable[[str], List], directory: str) -> float:
+    """Measure memory retained by a database reader.
+
+    Args:
+        reader: Function to read database with
+        directory: Database location
+
+    Returns:
+        Bytes retained per event
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    events = reader(directory)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used / len(events)
+
+
+@command()
+@option('-n', '--count', default=100_000, help='Number of events to create.')
+@option('-t', '--tasks', default=50, help='Number of tasks to create.')
+def main(count: int, tasks: int):
+    """Compare per-event memory footprint of a database read."""
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(directory, tasks, count)
+        before = measure(read_dict_events, directory)
+        after = measure(read_events, directory)
+    echo(f'dict based event: {before:.0f} bytes/event')
+    echo(f'compact event:    {after:.0f} bytes/event')
+    echo(f'saving:           {1 - after / before:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -18,10 +18,11 @@
 # You should have received a copy of the GNU General Public License along with
 # rdial.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 from os import makedirs
 from os.path import exists
-from typing import Dict, List
+from typing import Iterator, Tuple
 
 from click import BadOptionUsage, Path, argument, command, open_file, option
 from jnrbase.colourise import pwarn
@@ -30,37 +31,36 @@ from jnrbase.xdg_basedir import user_data
 from rdial.events import Events
 
 
-def process_events(location: str) -> Dict[str, List[str]]:
-    with Events.wrapping(location, write_cache=False) as evs:
-        task_warning = False
-        message_warning = False
-        files = defaultdict(list)
-        for ev in evs:
-            if '-' in ev.task:
-                task = ev.task.replace('-', '_')
-                if not task_warning:
-                    pwarn('Task names containing ‘-’ will use ‘_’ in export')
-                task_warning = True
-            else:
-                task = ev.task
-            if ev.message and not message_warning:
-                pwarn('Event messages aren’t supported by timew')
-                message_warning = True
-            out = [
-                f'inc {ev.start:%Y%m%dT%H%M%SZ}',
-            ]
-            if ev.delta:
-                out.append(f'- {ev.start + ev.delta:%Y%m%dT%H%M%SZ}')
-            out.append(f'# {task}\n')
-            files[ev.start.strftime('%Y-%m')].append(' '.join(out))
-    return files
+def process_events(location: str) -> Iterator[Tuple[str, str]]:
+    task_warning = False
+    message_warning = False
+    for ev in Events.iter_read(location):
+        if '-' in ev.task:
+            task = ev.task.replace('-', '_')
+            if not task_warning:
+                pwarn('Task names containing ‘-’ will use ‘_’ in export')
+            task_warning = True
+        else:
+            task = ev.task
+        if ev.message and not message_warning:
+            pwarn('Event messages aren’t supported by timew')
+            message_warning = True
+        out = [
+            f'inc {ev.start:%Y%m%dT%H%M%SZ}',
+        ]
+        if ev.delta:
+            out.append(f'- {ev.start + ev.delta:%Y%m%dT%H%M%SZ}')
+        out.append(f'# {task}\n')
+        yield ev.start.strftime('%Y-%m'), ' '.join(out)
 
 
-def write_events(location: str, files: Dict[str, List[str]]) -> None:
+def write_events(location: str, lines: Iterator[Tuple[str, str]]) -> None:
     makedirs(location)
-    for fn, data in files.items():
+    # Events arrive in start order, so each month’s file is completed before
+    # the next is started
+    for fn, data in groupby(lines, key=itemgetter(0)):
         with open_file(f'{location}/{fn}.data', 'w', atomic=True) as f:
-            f.writelines(data)
+            f.writelines(line for _, line in data)
 
 
 @command(
@@ -80,8 +80,7 @@ def main(database: str, output: str) -> None:
     """
     if exists(output):
         raise BadOptionUsage('output', 'Output path must not exist')
-    files = process_events(database)
-    write_events(output, files)
+    write_events(output, process_events(database))
 
 
 if __name__ == '__main__':
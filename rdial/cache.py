@@ -0,0 +1,671 @@
+#
+"""cache - Cache handling for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import array
+import bisect
+import collections.abc
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+from typing import (Any, Dict, Iterable, List, NamedTuple, Optional,
+                    Sequence, Tuple, Union)
+
+import click
+
+from jnrbase import xdg_basedir
+
+from . import utils
+
+#: Cache format version, bump on incompatible changes
+VERSION = 3
+
+#: Columnar task data; start and delta microseconds, and messages
+Columns = Tuple[array.array, array.array, List[str]]
+
+#: Task data file state; modification time, size and inode for each task
+Manifest = Dict[str, Tuple[int, int, int]]
+
+#: Daily task totals keyed by date ordinal; event count, and total duration,
+#: first start and last start in microseconds
+Days = Dict[int, List[int]]
+
+#: Microseconds in a day
+DAY = 86_400_000_000
+
+#: Messages longer than this many bytes are decoded on first access
+LAZY_SIZE = 64
+
+#: Size of the blocks task data prefixes are hashed in, see :func:`digest`
+DIGEST_BLOCK = 64 * 1024
+
+#: Size of each block’s digest
+DIGEST_SIZE = 16
+
+#: Index file identifier
+INDEX_MAGIC = b'RDIX'
+
+#: Index file header; identifier, version, event count, metadata offset and
+#: length, and message blob offset
+INDEX_HEADER = struct.Struct('<4sIQQQQ')
+
+
+class Messages(collections.abc.Sequence):
+    """Lazily decoded event messages.
+
+    Messages are stored as a single |UTF|-8 blob along with a table of offsets
+    in to it, and are only decoded when accessed.
+
+    """
+
+    def __init__(self, __blob: Union[bytes, memoryview],
+                 __offsets: Sequence[int]) -> None:
+        """Initialise a new ``Messages`` object.
+
+        Args:
+            __blob: Encoded messages
+            __offsets: Start of each message in ``__blob``, and the end of the
+                final message
+
+        """
+        self.blob = __blob
+        self.offsets = __offsets
+
+    def __len__(self) -> int:
+        """Count messages.
+
+        Returns:
+            Number of messages
+
+        """
+        return len(self.offsets) - 1
+
+    def __getitem__(self, __index: Union[int, slice]) -> Union[str, List[str]]:
+        """Decode messages.
+
+        Args:
+            __index: Message index, or slice of messages
+
+        Returns:
+            Selected message, or list of messages for a slice
+
+        Raises:
+            IndexError: Message index out of range
+
+        """
+        if isinstance(__index, slice):
+            return [self[n] for n in range(*__index.indices(len(self)))]
+        if __index < 0:
+            __index += len(self)
+        if not 0 <= __index < len(self):
+            raise IndexError('Message index out of range')
+        return str(self.blob[self.offsets[__index]:self.offsets[__index + 1]],
+                   'utf-8')
+
+    def lazy(self, __index: int) -> Union[str, 'LazyMessage']:
+        """Fetch message, deferring decoding of long messages.
+
+        Args:
+            __index: Message index
+
+        Returns:
+            Short messages, or a reference to a long message
+
+        """
+        if self.offsets[__index + 1] - self.offsets[__index] <= LAZY_SIZE:
+            return self[__index]
+        return LazyMessage(self, __index)
+
+
+class LazyMessage:
+    """Reference to a message that has not been decoded."""
+
+    __slots__ = ('messages', 'index')
+
+    def __init__(self, __messages: Messages, __index: int) -> None:
+        """Initialise a new ``LazyMessage`` object.
+
+        Args:
+            __messages: Message store
+            __index: Message index within store
+
+        """
+        self.messages = __messages
+        self.index = __index
+
+    def load(self) -> str:
+        """Decode message.
+
+        Returns:
+            Message text
+
+        """
+        return self.messages[self.index]
+
+
+class Snapshot(NamedTuple):
+    """Merged database cache, sorted by event start."""
+
+    #: Task file state when snapshot was taken
+    manifest: Manifest
+    #: Task names, indexed by ``task_ids``
+    tasks: List[str]
+    #: Task name index for each event
+    task_ids: Sequence[int]
+    #: Start time for each event in microseconds since the epoch
+    starts: Sequence[int]
+    #: Duration of each event in microseconds
+    deltas: Sequence[int]
+    #: Message for each event
+    messages: Sequence[str]
+
+
+class TaskState(NamedTuple):
+    """Task cache contents, along with the state needed to refresh it."""
+
+    #: Columnar task data
+    columns: Columns
+    #: Offset of the final row in the task data file
+    tail: int
+    #: :func:`digest` of the task data preceding ``tail``
+    digest: bytes
+    #: Modification time, size and inode of the task data file the cache was
+    #: written for, if known
+    stamp: Optional[Tuple[int, int, int]]
+
+
+class Catalog(NamedTuple):
+    """Per-task totals for a database."""
+
+    #: Task file state when catalog was built
+    manifest: Manifest
+    #: Event count, total duration, first and last start in microseconds, and
+    #: number of days with events for each task
+    tasks: Dict[str, Tuple[int, int, int, int, int]]
+
+
+class TaskRollup(NamedTuple):
+    """Daily totals for a task."""
+
+    #: Task file state when rollup was built, as stored in :data:`Manifest`
+    #: entries
+    stamp: Tuple[int, int, int]
+    #: Daily totals
+    days: Days
+    #: Start and duration of the task’s final event in microseconds, if any
+    last: Optional[Tuple[int, int]]
+
+
+class Rollups(NamedTuple):
+    """Per-task daily totals for a database."""
+
+    #: Task file state when rollups were built
+    manifest: Manifest
+    #: Daily totals for each task
+    days: Dict[str, Days]
+    #: Start and duration of the final event for each task, in microseconds
+    last: Dict[str, Tuple[int, int]]
+
+
+def cache_dir(__directory: str, create: bool = True) -> str:
+    """Find cache location for a database.
+
+    Args:
+        __directory: Database location
+        create: Whether to create the cache directory
+
+    Returns:
+        Cache location for database
+
+    """
+    xdg_cache_dir = xdg_basedir.user_cache('rdial')
+    location = os.path.join(xdg_cache_dir, __directory.replace('/', '_'))
+    if create and not os.path.isdir(location):
+        os.makedirs(location)
+        with click.open_file(f'{xdg_cache_dir}/CACHEDIR.TAG', 'w') as f:
+            f.writelines([
+                'Signature: 8a477f597d28d172789f06886806bc55\n',
+                '# This file is a cache directory tag created by rdial.\n',
+                '# For information about cache directory tags, see:\n',
+                '#   http://www.brynosaurus.com/cachedir/\n',
+            ])
+    return location
+
+
+def columns(__events: Iterable) -> Columns:
+    """Convert events to columnar data.
+
+    Args:
+        __events: Events to convert
+
+    Returns:
+        Start times, durations and messages
+
+    """
+    starts = array.array('q')
+    deltas = array.array('q')
+    messages = []
+    for event in __events:
+        starts.append(event.start_us)
+        deltas.append(event.delta_us)
+        messages.append(event.message)
+    return starts, deltas, messages
+
+
+def digest(__data: bytes) -> bytes:
+    """Compute digest for validating task data prefixes.
+
+    The data is hashed in :data:`DIGEST_BLOCK` sized blocks, so that the
+    digest of a modified prefix can be updated by hashing only the blocks
+    from the first modification onwards.
+
+    Args:
+        __data: Data to hash
+
+    Returns:
+        Concatenated digests of each block of ``__data``
+
+    """
+    view = memoryview(__data)
+    return b''.join(
+        hashlib.blake2b(view[n:n + DIGEST_BLOCK],
+                        digest_size=DIGEST_SIZE).digest()
+        for n in range(0, len(view), DIGEST_BLOCK))
+
+
+def _load(__fname: str) -> Optional[Dict[str, Any]]:
+    """Read a :mod:`marshal` cache file.
+
+    Args:
+        __fname: Cache file to read
+
+    Returns:
+        Cached data, or ``None`` if the file is unusable or from a different
+        cache version
+
+    """
+    try:
+        with open(__fname, 'rb') as f:
+            cache = marshal.load(f)
+    except (EOFError, ValueError, TypeError, OSError):
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != VERSION:
+        return None
+    return cache
+
+
+def _dump(__fname: str, __data: Dict[str, Any]) -> None:
+    """Write a :mod:`marshal` cache file.
+
+    Args:
+        __fname: Cache file to write
+        __data: Data to cache, tagged with :data:`VERSION` on write
+
+    """
+    with click.open_file(__fname, 'wb', atomic=True) as f:
+        marshal.dump(dict(__data, version=VERSION), f)
+
+
+def read_task_state(__fname: str) -> Optional['TaskState']:
+    """Read task cache file, along with its refresh state.
+
+    The refresh state allows a cache to be updated by parsing only the rows
+    that were added since it was written, see :func:`write_task`.
+
+    Args:
+        __fname: Cache file to read
+
+    Returns:
+        Cached task state, or ``None`` if the cache is unusable
+
+    """
+    cache = _load(__fname)
+    if cache is None:
+        return None
+    starts = array.array('q')
+    starts.frombytes(cache['start'])
+    deltas = array.array('q')
+    deltas.frombytes(cache['delta'])
+    stamp = cache.get('stamp')
+    return TaskState((starts, deltas, cache['message']), cache.get('tail', 0),
+                     cache.get('digest', b''),
+                     tuple(stamp) if stamp else None)
+
+
+def read_task(__fname: str) -> Optional[Columns]:
+    """Read task cache file.
+
+    Args:
+        __fname: Cache file to read
+
+    Returns:
+        Cached columns, or ``None`` if the cache is unusable
+
+    """
+    state = read_task_state(__fname)
+    return None if state is None else state.columns
+
+
+def write_task(__fname: str, __columns: Columns, tail: int = 0,
+               digest: bytes = b'',
+               stamp: Optional[Tuple[int, int, int]] = None) -> None:
+    """Write task cache file.
+
+    Args:
+        __fname: Cache file to write
+        __columns: Columnar task data
+        tail: Offset of the final row in the task data file
+        digest: :func:`digest` of the task data preceding ``tail``
+        stamp: Modification time, size and inode of the task data file the
+            cache matches, if known
+
+    """
+    starts, deltas, messages = __columns
+    _dump(__fname, {
+        'start': starts.tobytes(),
+        'delta': deltas.tobytes(),
+        'message': messages,
+        'tail': tail,
+        'digest': digest,
+        'stamp': stamp,
+    })
+
+
+def scan(__directory: str) -> Manifest:
+    """Collect task file state for a database.
+
+    This is performed in a single :func:`os.scandir` pass, so it is
+    significantly cheaper than checking each file individually.
+
+    Args:
+        __directory: Database location
+
+    Returns:
+        Modification time, size and inode for each task file
+
+    """
+    manifest = {}
+    with os.scandir(__directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.name.endswith('.csv'):
+                continue
+            stat = entry.stat()
+            manifest[entry.name[:-4]] = (stat.st_mtime_ns, stat.st_size,
+                                         stat.st_ino)
+    return manifest
+
+
+def _column(__buffer: memoryview, __code: str, __offset: int,
+            __count: int) -> Sequence[int]:
+    """Fetch integer column from index file.
+
+    Args:
+        __buffer: Index file contents
+        __code: :mod:`array` type code for column
+        __offset: Start of column in ``__buffer``
+        __count: Number of entries in column
+
+    Returns:
+        Column values, without copying on little-endian systems
+
+    """
+    size = struct.calcsize(__code)
+    data = __buffer[__offset:__offset + __count * size]
+    if sys.byteorder == 'little':
+        return data.cast(__code)
+    column = array.array(__code, data.tobytes())  # pragma: no cover
+    column.byteswap()  # pragma: no cover
+    return column  # pragma: no cover
+
+
+def _index_header(__buffer: memoryview
+                  ) -> Optional[Tuple[int, int, int, int]]:
+    """Validate an index file’s header.
+
+    Args:
+        __buffer: Index file contents
+
+    Returns:
+        Event count, metadata offset and length, and message blob offset, or
+        ``None`` if the header is unusable
+
+    """
+    if len(__buffer) < INDEX_HEADER.size:
+        return None
+    magic, version, count, meta_offset, meta_length, blob_offset = \
+        INDEX_HEADER.unpack_from(__buffer)
+    if magic != INDEX_MAGIC or version != VERSION \
+            or blob_offset > len(__buffer):
+        return None
+    return count, meta_offset, meta_length, blob_offset
+
+
+def read_snapshot(__fname: str) -> Optional[Snapshot]:
+    """Read database index file.
+
+    The file is memory mapped, and its columns are returned as views in to
+    the mapping so only the rows that are accessed are read from disk.
+
+    Args:
+        __fname: Index file to read
+
+    Returns:
+        Cached snapshot, or ``None`` if the index is unusable
+
+    """
+    try:
+        with open(__fname, 'rb') as f:
+            buffer = memoryview(mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        return None
+    header = _index_header(buffer)
+    if header is None:
+        return None
+    count, meta_offset, meta_length, blob_offset = header
+    try:
+        meta = marshal.loads(buffer[meta_offset:meta_offset + meta_length])
+    except (EOFError, ValueError, TypeError):
+        return None
+    offset = INDEX_HEADER.size
+    starts = _column(buffer, 'q', offset, count)
+    deltas = _column(buffer, 'q', offset + count * 8, count)
+    offsets = _column(buffer, 'q', offset + count * 16, count + 1)
+    task_ids = _column(buffer, 'i', offset + count * 24 + 8, count)
+    return Snapshot(meta['manifest'], meta['tasks'], task_ids, starts, deltas,
+                    Messages(buffer[blob_offset:], offsets))
+
+
+def write_snapshot(__fname: str, __snapshot: Snapshot) -> None:
+    """Write database index file.
+
+    The index contains fixed width little-endian columns of start times,
+    durations, message offsets and task indexes, followed by the task table
+    and manifest, and finally the message blob.
+
+    Args:
+        __fname: Index file to write
+        __snapshot: Merged database data
+
+    """
+    count = len(__snapshot.starts)
+    columns = [
+        array.array('q', __snapshot.starts),
+        array.array('q', __snapshot.deltas),
+    ]
+    offsets = array.array('q', [0])
+    messages = []
+    for message in __snapshot.messages:
+        messages.append(message.encode('utf-8'))
+        offsets.append(offsets[-1] + len(messages[-1]))
+    columns.extend([offsets, array.array('i', __snapshot.task_ids)])
+    if sys.byteorder != 'little':  # pragma: no cover
+        for column in columns:
+            column.byteswap()
+    meta = marshal.dumps({
+        'manifest': __snapshot.manifest,
+        'tasks': __snapshot.tasks,
+    })
+    meta_offset = INDEX_HEADER.size + count * 28 + 8
+    blob_offset = meta_offset + len(meta)
+    with click.open_file(__fname, 'wb', atomic=True) as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION, count, meta_offset,
+                                  len(meta), blob_offset))
+        for column in columns:
+            f.write(column.tobytes())
+        f.write(meta)
+        f.write(b''.join(messages))
+
+
+def rollup(__starts: Sequence[int], __deltas: Sequence[int]) -> Days:
+    """Total event data by day.
+
+    Args:
+        __starts: Event start times in microseconds since the epoch
+        __deltas: Event durations in microseconds
+
+    Returns:
+        Daily totals
+
+    """
+    ordinal = utils.EPOCH.toordinal()
+    days = {}
+    for start, delta in zip(__starts, __deltas):
+        day = start // DAY + ordinal
+        totals = days.get(day)
+        if totals is None:
+            days[day] = [1, delta, start, start]
+        else:
+            totals[0] += 1
+            totals[1] += delta
+            if start < totals[2]:
+                totals[2] = start
+            elif start > totals[3]:
+                totals[3] = start
+    return days
+
+
+def update_rollup(__days: Days, __starts: Sequence[int],
+                  __deltas: Sequence[int], __since: int) -> Days:
+    """Refresh daily totals from a given time onwards.
+
+    Only the days from the one containing ``__since`` onwards are totalled,
+    so the cost depends on the number of recent events and not the size of
+    the task’s history.
+
+    Args:
+        __days: Daily totals to update, see :func:`rollup`
+        __starts: Sorted event start times in microseconds since the epoch
+        __deltas: Event durations in microseconds
+        __since: Earliest modified start time in microseconds since the epoch
+
+    Returns:
+        Updated daily totals
+
+    """
+    ordinal = utils.EPOCH.toordinal()
+    first = __since // DAY
+    lo = bisect.bisect_left(__starts, first * DAY)
+    days = {
+        day: totals
+        for day, totals in __days.items() if day < first + ordinal
+    }
+    days.update(rollup(__starts[lo:], __deltas[lo:]))
+    return days
+
+
+def read_rollup(__fname: str) -> Optional[TaskRollup]:
+    """Read task rollup file.
+
+    Args:
+        __fname: Rollup file to read
+
+    Returns:
+        Cached rollup, or ``None`` if the rollup is unusable
+
+    """
+    cache = _load(__fname)
+    if cache is None:
+        return None
+    return TaskRollup(cache['stamp'], cache['days'], cache['last'])
+
+
+def write_rollup(__fname: str, __rollup: TaskRollup) -> None:
+    """Write task rollup file.
+
+    Args:
+        __fname: Rollup file to write
+        __rollup: Daily totals for task
+
+    """
+    _dump(__fname, {
+        'stamp': __rollup.stamp,
+        'days': __rollup.days,
+        'last': __rollup.last,
+    })
+
+
+def summarise(__days: Days) -> Tuple[int, int, int, int, int]:
+    """Total daily totals.
+
+    Args:
+        __days: Daily totals, see :func:`rollup`
+
+    Returns:
+        Event count, total duration, first and last start in microseconds,
+        and number of days with events
+
+    """
+    totals = list(__days.values())
+    return (sum(day[0] for day in totals), sum(day[1] for day in totals),
+            min(day[2] for day in totals), max(day[3] for day in totals),
+            len(totals))
+
+
+def read_catalog(__fname: str) -> Optional[Catalog]:
+    """Read task catalog file.
+
+    Args:
+        __fname: Catalog file to read
+
+    Returns:
+        Cached catalog, or ``None`` if the catalog is unusable
+
+    """
+    cache = _load(__fname)
+    if cache is None:
+        return None
+    return Catalog(cache['manifest'], cache['tasks'])
+
+
+def write_catalog(__fname: str, __catalog: Catalog) -> None:
+    """Write task catalog file.
+
+    Args:
+        __fname: Catalog file to write
+        __catalog: Per-task totals for database
+
+    """
+    _dump(__fname, {
+        'manifest': __catalog.manifest,
+        'tasks': __catalog.tasks,
+    })
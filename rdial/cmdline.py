@@ -26,22 +26,21 @@ import logging
 import operator
 import os
 import shlex
-import subprocess
-from typing import Callable, Optional
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterator, List,
+                    Optional, Tuple)
 
 import click
-import click_log
-import tabulate
 
-from jnrbase import colourise, iso_8601
 from jnrbase.attrdict import ROAttrDict
 
-from . import _version, utils
-from .events import Event, Events, TaskNotRunningError, TaskRunningError
+from . import _version, codec, completion, utils
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import state  # NOQA: F401
+    from .events import Event, Events, Summary  # NOQA: F401
 
 
 LOGGER = logging.getLogger('rdial')
-click_log.basic_config(LOGGER)
 
 
 class TaskNameParamType(click.ParamType):
@@ -103,6 +102,27 @@ class StartTimeParamType(click.ParamType):
         return __value
 
 
+class TableStyleParamType(click.Choice):
+    """Table style parameter handler.
+
+    The available styles are only fetched from :mod:`tabulate` when they’re
+    needed, as importing it is a significant part of :program:`rdial`’s start
+    up time.
+
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self) -> None:
+        """Initialise a new ``TableStyleParamType`` object."""
+        self.case_sensitive = True
+
+    @property
+    def choices(self) -> List[str]:
+        """Available table styles."""
+        import tabulate
+        return list(tabulate._table_formats.keys())
+
+
 def task_from_dir(__ctx: click.Context, __param: click.Option,
                   __value: bool) -> None:
     """Override task name default using name of current directory.
@@ -119,7 +139,7 @@ def task_from_dir(__ctx: click.Context, __param: click.Option,
     __param.default = os.path.basename(os.path.abspath(os.curdir))
 
 
-def get_stop_message(__current: Event, __edit: bool = False) -> str:
+def get_stop_message(__current: 'Event', __edit: bool = False) -> str:
     """Interactively fetch stop message.
 
     Args:
@@ -132,7 +152,7 @@ def get_stop_message(__current: Event, __edit: bool = False) -> str:
     """
     marker = '# Text below here ignored\n'
     task_message = (f'# Task “{__current.task}” started '
-                    f'{iso_8601.format_datetime(__current.start)}Z')
+                    f'{codec.format_datetime(__current.start)}')
     template = f'{__current.message}\n{marker}{task_message}'
     message = click.edit(template, require_save=not __edit)
     if message is None:
@@ -168,7 +188,8 @@ def task_option(__fun: Callable) -> Callable:
         default='default',
         envvar='RDIAL_TASK',
         required=False,
-        type=TaskNameParamType())(__fun)
+        type=TaskNameParamType(),
+        **completion.completer(completion.complete_tasks))(__fun)
     return __fun
 
 
@@ -191,6 +212,14 @@ def duration_option(__fun: Callable) -> Callable:
         default='all',
         type=click.Choice(['day', 'week', 'month', 'year', 'all']),
         help='Filter events for specified time period.')(__fun)
+    __fun = click.option(
+        '--since',
+        type=StartTimeParamType(),
+        help='Filter events starting at or after time.')(__fun)
+    __fun = click.option(
+        '--until',
+        type=StartTimeParamType(),
+        help='Filter events starting before time.')(__fun)
     return __fun
 
 
@@ -220,14 +249,47 @@ def message_option(__fun: Callable) -> Callable:
 # pylint: disable=too-many-arguments
 
 
+def set_verbosity(__ctx: click.Context, __param: click.Option,
+                  __value: str):
+    """Configure command line logging.
+
+    :mod:`click_log` is only imported here, as it isn’t needed until
+    a command runs.
+
+    Args:
+        __ctx: Current command context
+        __param: Parameter being processed
+        __value: Name of logging level
+
+    Raises:
+        click.BadParameter: Unknown logging level
+
+    """
+    import click_log
+    level = getattr(logging, __value.upper(), None)
+    if not isinstance(level, int):
+        raise click.BadParameter(
+            'Must be CRITICAL, ERROR, WARNING, INFO or DEBUG, not '
+            f'{__value!r}')
+    click_log.basic_config(LOGGER)
+    LOGGER.setLevel(level)
+
+
 @click.group(
     help='Minimal time tracking for maximal benefit.',
     epilog=('Please report bugs at '
             'https://github.com/JNRowe/rdial/issues'),
     context_settings={'help_option_names': ['-h', '--help']})
 @click.version_option(_version.dotted)
-@click_log.simple_verbosity_option(LOGGER, help='Set verbosity level.',
-                                   metavar='LEVEL')
+@click.option(
+    '--verbosity',
+    '-v',
+    default='INFO',
+    metavar='LEVEL',
+    expose_value=False,
+    is_eager=True,
+    callback=set_verbosity,
+    help='Set verbosity level.')
 @click.option(
     '-d',
     '--directory',
@@ -285,6 +347,7 @@ def cli(ctx: click.Context, directory: str, backup: bool, cache: bool,
         base['colour'] = base['color']
         LOGGER.debug(f'Handling ‘color’ to set {base["colour"]}')
     colour = base.getboolean('colour')
+    from jnrbase import colourise
     colourise.COLOUR = colour
 
     ctx.default_map = {}
@@ -305,43 +368,272 @@ def cli(ctx: click.Context, directory: str, backup: bool, cache: bool,
         colour=colour,
         config=cfg,
         directory=base['directory'],
+        executor=base['executor'],
+        file_format=config_format(base['format']),
         interactive=base.getboolean('interactive'),
+        storage=base['storage'],
     )
     LOGGER.debug(f'Setting ctx’s obj to {ctx.obj!r}')
 
 
+def config_format(__value: str) -> int:
+    """Validate task data file format from configuration.
+
+    Args:
+        __value: Configured ``format`` value
+
+    Returns:
+        Task data file format
+
+    Raises:
+        click.UsageError: Unknown file format
+
+    """
+    from .events import FORMATS
+    try:
+        file_format = int(__value)
+    except ValueError:
+        file_format = None
+    if file_format not in FORMATS:
+        choices = ', '.join(map(str, FORMATS))
+        raise click.UsageError(f'Invalid ‘format’ config value {__value!r}, '
+                               f'must be one of {choices}')
+    return file_format
+
+
+def format_period(__period: str, __date: datetime.date) -> str:
+    """Format report period.
+
+    Args:
+        __period: Period type; ``day``, ``week`` or ``month``
+        __date: First day of period
+
+    Returns:
+        |ISO|-8601 formatted period
+
+    """
+    if __period == 'week':
+        year, week, _ = __date.isocalendar()
+        return f'{year}-W{week:02d}'
+    elif __period == 'month':
+        return f'{__date:%Y-%m}'
+    return f'{__date:%F}'
+
+
+def query_window(__duration: str = 'all',
+                 __since: Optional[datetime.datetime] = None,
+                 __until: Optional[datetime.datetime] = None
+                 ) -> Tuple[Optional[datetime.datetime],
+                            Optional[datetime.datetime]]:
+    """Combine time window options.
+
+    Args:
+        __duration: Time window to filter on
+        __since: Only include events starting at or after this time
+        __until: Only include events starting before this time
+
+    Returns:
+        Start and end of window, or ``None`` for unbounded ends
+
+    """
+    since, until = utils.duration_window(__duration)
+    if __since and (since is None or __since > since):
+        since = __since
+    if __until and (until is None or __until < until):
+        until = __until
+    return since, until
+
+
 def filter_events(__globs: ROAttrDict,
                   __task: Optional[str] = None,
-                  __duration: str = 'all') -> Events:
+                  __duration: str = 'all',
+                  __since: Optional[datetime.datetime] = None,
+                  __until: Optional[datetime.datetime] = None) -> 'Events':
     """Filter events for report processing.
 
     Args:
         __globs: Global options object
         __task: Task name to filter on
         __duration: Time window to filter on
+        __since: Only include events starting at or after this time
+        __until: Only include events starting before this time
 
     Returns:
         Events: Events matching specified criteria
 
     """
-    events = Events.read(__globs.directory, write_cache=__globs.cache)
-    if __task:
-        events = events.for_task(__task)
-    if not __duration == 'all':  # pragma: no cover
-        if __duration == 'week':
-            today = datetime.date.today()
-            events = events.for_week(*today.isocalendar()[:2])
-        else:
-            year, month, day = datetime.date.today().timetuple()[:3]
-            if __duration == 'month':
-                day = None
-            elif __duration == 'year':
-                month = None
-                day = None
-            events = events.for_date(year, month, day)
+    from .events import Events
+    since, until = query_window(__duration, __since, __until)
+    events = Events.read(__globs.directory, write_cache=__globs.cache,
+                         storage=__globs.storage, executor=__globs.executor,
+                         tasks=[__task] if __task else None, since=since,
+                         until=until)
     return events
 
 
+def stream_events(__globs: ROAttrDict,
+                  __task: Optional[str] = None,
+                  __duration: str = 'all',
+                  __since: Optional[datetime.datetime] = None,
+                  __until: Optional[datetime.datetime] = None
+                  ) -> Iterator['Event']:
+    """Stream events for export processing.
+
+    Args:
+        __globs: Global options object
+        __task: Task name to filter on
+        __duration: Time window to filter on
+        __since: Only include events starting at or after this time
+        __until: Only include events starting before this time
+
+    Returns:
+        Events matching specified criteria, in start order
+
+    """
+    from .events import Events
+    since, until = query_window(__duration, __since, __until)
+    return Events.iter_read(__globs.directory, __globs.storage,
+                            tasks=[__task] if __task else None, since=since,
+                            until=until)
+
+
+def summarise_events(__globs: ROAttrDict,
+                     __fields: List[str],
+                     __task: Optional[str] = None,
+                     __duration: str = 'all',
+                     __since: Optional[datetime.datetime] = None,
+                     __until: Optional[datetime.datetime] = None
+                     ) -> Tuple[Dict[Tuple, 'Summary'], Optional['Event']]:
+    """Summarise events for report processing.
+
+    Precomputed totals are used when the storage backend can answer the
+    query, and events are only read when it can’t.
+
+    Args:
+        __globs: Global options object
+        __fields: Fields to group by
+        __task: Task name to filter on
+        __duration: Time window to filter on
+        __since: Only include events starting at or after this time
+        __until: Only include events starting before this time
+
+    Returns:
+        Summaries and the final matching event
+
+    """
+    from .events import get_storage
+    since, until = query_window(__duration, __since, __until)
+    backend = get_storage(__globs.storage, __globs.directory,
+                          write_cache=__globs.cache,
+                          executor=__globs.executor)
+    result = backend.aggregate(__fields, [__task] if __task else None, since,
+                               until)
+    if result is None:
+        events = filter_events(__globs, __task, __duration, since, until)
+        result = events.aggregate(*__fields), events.last()
+    return result
+
+
+def echo_stats(__summary: Optional['Summary']) -> None:
+    """Display database statistics for a report query.
+
+    Args:
+        __summary: Summary of events matching the query, if any
+
+    """
+    count = __summary.count if __summary else 0
+    click.echo(f'{count} event{"s" if count else ""} in query')
+    click.echo('Duration of events {}'.format(
+        __summary.duration if __summary else datetime.timedelta(0)))
+    if __summary:
+        click.echo(f'First entry started at {__summary.first}')
+        click.echo(f'Last entry started at {__summary.last}')
+    click.echo(f'Events exist on {__summary.dates if __summary else 0} dates')
+
+
+def report_rows(__summaries: Dict[Tuple, 'Summary'], __fields: List[str],
+                __sort: str, __reverse: bool) -> List[List[Any]]:
+    """Generate report table rows from summaries.
+
+    Args:
+        __summaries: Summaries keyed by their group values
+        __fields: Fields summaries are grouped by
+        __sort: Key to sort rows on
+        __reverse: Reverse sort order
+
+    Returns:
+        Sorted report rows, with formatted periods
+
+    """
+    data = sorted(
+        (list(key) + [summary.duration]
+         for key, summary in __summaries.items()),
+        key=(operator.itemgetter(*range(len(__fields))) if __sort == 'task'
+             else operator.itemgetter(-1)),
+        reverse=__reverse)
+    if len(__fields) > 1:
+        for row in data:
+            row[1] = format_period(__fields[1], row[1])
+    return data
+
+
+def read_state(__globs: ROAttrDict) -> 'state.State':
+    """Fetch database state for status commands.
+
+    The state file is used when it is up to date, and events are only read
+    when it isn’t.  The state file is rewritten after reading events, so
+    later status commands can skip them.
+
+    Args:
+        __globs: Global options object
+
+    Returns:
+        Database state
+
+    """
+    from . import state
+    current = state.read(__globs.directory)
+    if current is None:
+        from .events import Events
+        events = Events.read(__globs.directory, write_cache=__globs.cache,
+                             storage=__globs.storage,
+                             executor=__globs.executor)
+        try:
+            current = state.write(__globs.directory, events)
+        except OSError:
+            current = state.from_events(events)
+    return current
+
+
+def running_in_query(__globs: ROAttrDict,
+                     __task: Optional[str] = None,
+                     __duration: str = 'all',
+                     __since: Optional[datetime.datetime] = None,
+                     __until: Optional[datetime.datetime] = None) -> bool:
+    """Check whether the running event matches export criteria.
+
+    This allows streaming exports to report the running event before the
+    stream has been read.
+
+    Args:
+        __globs: Global options object
+        __task: Task name to filter on
+        __duration: Time window to filter on
+        __since: Only include events starting at or after this time
+        __until: Only include events starting before this time
+
+    Returns:
+        ``True`` if the running event matches the criteria
+
+    """
+    current = read_state(__globs)
+    if not current.task or __task and current.task != __task:
+        return False
+    since, until = query_window(__duration, __since, __until)
+    return (since is None or current.start >= since) \
+        and (until is None or current.start < until)
+
+
 @cli.command(hidden=True)
 def bug_data():
     """Produce data for rdial bug reports."""
@@ -364,6 +656,49 @@ def bug_data():
         click.echo(f'* {link}: {ver}')
 
 
+@cli.command()
+@click.pass_obj
+def checkpoint(globs: ROAttrDict):
+    """Fold journal in to task data files.
+
+    \f
+    Args:
+        globs: Global options object
+
+    """
+    from . import state
+    from .events import Events
+    events = Events.read(globs.directory, globs.backup, globs.cache,
+                         globs.storage, executor=globs.executor,
+                         file_format=globs.file_format)
+    events.checkpoint(globs.directory)
+    state.write(globs.directory, events)
+
+
+@cli.command()
+@click.option(
+    '--format',
+    'file_format',
+    type=click.Choice(['1', '2']),
+    default='2',
+    help='Task data file format to convert to.')
+@click.pass_obj
+def migrate(globs: ROAttrDict, file_format: str):
+    """Convert task data files to a different format.
+
+    \f
+    Args:
+        globs: Global options object
+        file_format: Task data file format to convert to
+
+    """
+    from .events import get_storage
+    backend = get_storage(globs.storage, globs.directory, globs.backup,
+                          globs.cache, globs.executor, int(file_format))
+    for task in backend.migrate():
+        click.echo(f'Converted {task}')
+
+
 @cli.command()
 @click.option(
     '-p/-q',
@@ -382,7 +717,12 @@ def fsck(ctx: click.Context, globs: ROAttrDict, progress: bool):
         progress: Display progressbar
 
     """
-    events = Events.read(globs.directory, write_cache=globs.cache)
+    from jnrbase import colourise
+
+    from .events import Event, Events
+    # Events are streamed, so the progressbar can’t know the total without
+    # a second pass over the database
+    events = Events.iter_read(globs.directory, globs.storage)
     now = datetime.datetime.utcnow()
     # Note: progress is *four* times slower on my data and system
     if progress:
@@ -457,10 +797,15 @@ def start(globs: ROAttrDict, task: str, continue_: bool, new: bool,
         time: Task start time
 
     """
-    with Events.wrapping(globs.directory, globs.backup, globs.cache) as events:
+    from . import state
+    from .events import Events
+    with Events.appending(globs.directory, globs.backup, globs.cache,
+                          globs.storage, globs.executor,
+                          globs.file_format) as events:
         if continue_:
             task = events.last().task
         events.start(task, new, time)
+    state.write(globs.directory, events)
 
 
 @cli.command()
@@ -479,9 +824,13 @@ def stop(globs: ROAttrDict, message: str, fname: str, amend: bool):
         amend: Amend a previously stopped event
 
     """
+    from . import state
+    from .events import Events, TaskNotRunningError, TaskRunningError
     if fname:
         message = fname.read()
-    with Events.wrapping(globs.directory, globs.backup, globs.cache) as events:
+    with Events.appending(globs.directory, globs.backup, globs.cache,
+                          globs.storage, globs.executor,
+                          globs.file_format) as events:
         last_event = events.last()
         if last_event.running():
             if amend:
@@ -495,6 +844,7 @@ def stop(globs: ROAttrDict, message: str, fname: str, amend: bool):
         if globs.interactive and not message:
             message = get_stop_message(last_event, amend)
         events.stop(message, force=amend)
+    state.write(globs.directory, events)
     event = events.last()
     click.echo('Task {} running for {}'.format(event.task,
                                                str(event.delta).split('.')[0]))
@@ -528,9 +878,13 @@ def switch(globs: ROAttrDict, task: str, new: bool, time: datetime,
         fname: Filename to read message from
 
     """
+    from . import state
+    from .events import Events, TaskNotRunningError, TaskRunningError
     if fname:
         message = fname.read()
-    with Events.wrapping(globs.directory, globs.backup, globs.cache) as events:
+    with Events.appending(globs.directory, globs.backup, globs.cache,
+                          globs.storage, globs.executor,
+                          globs.file_format) as events:
         event = events.last()
         if time and time < event.start:
             raise TaskNotRunningError('Can’t specify a start time before '
@@ -550,6 +904,7 @@ def switch(globs: ROAttrDict, task: str, new: bool, time: datetime,
             events.stop(message, force=amend)
         events.last().delta = time - event.start
         events.start(task, new, time)
+    state.write(globs.directory, events)
     click.echo('Task {} running for {}'.format(event.task,
                                                str(event.delta).split('.')[0]))
 
@@ -581,7 +936,13 @@ def run(globs: ROAttrDict, task: str, new: bool, time: datetime, message: str,
         command: Command to run
 
     """
-    with Events.wrapping(globs.directory, globs.backup, globs.cache) as events:
+    import subprocess
+
+    from . import state
+    from .events import Events, TaskRunningError
+    with Events.appending(globs.directory, globs.backup, globs.cache,
+                          globs.storage, globs.executor,
+                          globs.file_format) as events:
         if events.running():
             raise TaskRunningError(
                 f'Task {events.last().task} is already started!')
@@ -597,6 +958,7 @@ def run(globs: ROAttrDict, task: str, new: bool, time: datetime, message: str,
         if globs.interactive and not message:
             message = get_stop_message(events.last())
         events.stop(message)
+    state.write(globs.directory, events)
     event = events.last()
     click.echo('Task {} running for {}'.format(event.task,
                                                str(event.delta).split('.')[0]))
@@ -613,7 +975,8 @@ def run(globs: ROAttrDict, task: str, new: bool, time: datetime, message: str,
     help='Set start time.',
     type=StartTimeParamType())
 @message_option
-@click.argument('wrapper', default='default')
+@click.argument('wrapper', default='default',
+                **completion.completer(completion.complete_wrappers))
 @click.pass_obj
 @click.pass_context
 def wrapper(ctx: click.Context, globs: ROAttrDict, time: datetime,
@@ -657,14 +1020,21 @@ def wrapper(ctx: click.Context, globs: ROAttrDict, time: datetime,
     default=False,
     envvar='RDIAL_REVERSE',
     help='Reverse sort order.')
+@click.option(
+    '-g',
+    '--group-by',
+    type=click.Choice(['day', 'week', 'month']),
+    help='Split task totals by time period.')
 @click.option(
     '--style',
     default='simple',
-    type=click.Choice(tabulate._table_formats.keys()),
+    type=TableStyleParamType(),
     help='Table output style.')
 @click.pass_obj
-def report(globs: ROAttrDict, task: str, stats: bool, duration: str, sort: str,
-           reverse: bool, style: str):
+def report(globs: ROAttrDict, task: str, stats: bool, duration: str,
+           since: Optional[datetime.datetime],
+           until: Optional[datetime.datetime], sort: str, reverse: bool,
+           group_by: Optional[str], style: str):
     """Report time tracking data.
 
     \f
@@ -673,33 +1043,78 @@ def report(globs: ROAttrDict, task: str, stats: bool, duration: str, sort: str,
         task: Task name to operate on
         stats: Display short overview of data
         duration: Time window to filter on
+        since: Only include events starting at or after this time
+        until: Only include events starting before this time
         sort: Key to sort events on
         reverse: Reverse sort order
+        group_by: Time period to split task totals by
         style: Table formatting style
 
     """
+    import tabulate
+
     if task == 'default':
         # Lazy way to remove duplicate argument definitions
         task = None
-    events = filter_events(globs, task, duration)
     if stats:
-        click.echo(f'{len(events)} event{"s" if events else ""} in query')
-        click.echo(f'Duration of events {events.sum()}')
-        if events:
-            click.echo(f'First entry started at {events[0].start}')
-            click.echo(f'Last entry started at {events[-1].start}')
-        dates = {e.start.date() for e in events}
-        click.echo(f'Events exist on {len(dates)} dates')
+        summaries, current = summarise_events(globs, [], task, duration,
+                                              since, until)
+        echo_stats(summaries.get(()))
     else:
-        data = sorted(([t, events.for_task(t).sum()] for t in events.tasks()),
-                      key=operator.itemgetter(['task', 'time'].index(sort)),
-                      reverse=reverse)
+        fields = ['task', group_by] if group_by else ['task']
+        summaries, current = summarise_events(globs, fields, task, duration,
+                                              since, until)
+        data = report_rows(summaries, fields, sort, reverse)
         click.echo_via_pager(
-            tabulate.tabulate(data, ['task', 'time'], tablefmt=style))
-    if events.running():
-        current = events.last()
+            tabulate.tabulate(data, fields + ['time'], tablefmt=style))
+    if current and current.running():
         click.echo(f'Task “{current.task}” started '
-                   f'{iso_8601.format_datetime(current.start)}Z')
+                   f'{codec.format_datetime(current.start)}')
+
+
+@cli.command()
+@click.option(
+    '-s',
+    '--sort',
+    default='task',
+    type=click.Choice(['task', 'time', 'last']),
+    help='Field to sort by.')
+@click.option(
+    '-r',
+    '--reverse/--no-reverse',
+    default=False,
+    help='Reverse sort order.')
+@click.option(
+    '--style',
+    default='simple',
+    type=TableStyleParamType(),
+    help='Table output style.')
+@click.pass_obj
+def tasks(globs: ROAttrDict, sort: str, reverse: bool, style: str):
+    """List tasks in database.
+
+    \f
+    Args:
+        globs: Global options object
+        sort: Key to sort tasks on
+        reverse: Reverse sort order
+        style: Table formatting style
+
+    """
+    import tabulate
+
+    from .events import Events
+    catalog = Events.catalog(globs.directory, globs.cache, globs.storage)
+    data = [[
+        task, summary.count, summary.duration,
+        codec.format_datetime(summary.first),
+        codec.format_datetime(summary.last)
+    ] for task, summary in catalog.items()]
+    column = {'task': 0, 'time': 2, 'last': 4}[sort]
+    data.sort(key=operator.itemgetter(column), reverse=reverse)
+    click.echo_via_pager(
+        tabulate.tabulate(data, ['task', 'events', 'time', 'first', 'last'],
+                          tablefmt=style))
 
 
 @cli.command()
@@ -712,9 +1127,8 @@ def running(globs: ROAttrDict):
         globs: Global options object
 
     """
-    events = Events.read(globs.directory, write_cache=globs.cache)
-    if events.running():
-        current = events.last()
+    current = read_state(globs)
+    if current.task:
         now = datetime.datetime.utcnow()
         click.echo('Task “{}” started {}'.format(
             current.task,
@@ -733,14 +1147,63 @@ def last(globs: ROAttrDict):
         globs: Global options object
 
     """
-    events = Events.read(globs.directory, write_cache=globs.cache)
-    event = events.last()
-    if not events.running():
-        click.echo(f'Last task {event.task}, ran for {event.delta}')
-        if event.message:
-            click.echo(event.message)
+    current = read_state(globs)
+    if current.task:
+        LOGGER.warning(f'Task {current.task} is still running')
+    elif current.last_task:
+        click.echo(f'Last task {current.last_task}, ran for '
+                   f'{current.last_delta}')
+        if current.last_message:
+            click.echo(current.last_message)
     else:
-        LOGGER.warning(f'Task {event.task} is still running')
+        LOGGER.warning('No events recorded!')
+
+
+@cli.command()
+@click.option(
+    '-f',
+    '--format',
+    'format_',
+    help='Format string for output lines, defaults to JSON.')
+@click.option(
+    '-t',
+    '--tick',
+    default=60,
+    type=click.FloatRange(0),
+    help='Seconds between updates while a task is running, 0 to disable.')
+@click.option(
+    '--poll', is_flag=True, help='Poll for changes instead of using inotify.')
+@click.pass_obj
+def watch(globs: ROAttrDict, format_: Optional[str], tick: float, poll: bool):
+    """Stream task state changes.
+
+    \f
+    Args:
+        globs: Global options object
+        format_: Format string for output lines
+        tick: Interval between updates while a task is running
+        poll: Whether to poll for changes
+
+    """
+    import json
+
+    from . import watcher
+    monitor = watcher.get_watcher(globs.directory, poll)
+    try:
+        for current in watcher.follow(globs.directory, monitor,
+                                      read_state(globs), tick):
+            fields = watcher.fields(current)
+            if format_:
+                click.echo(format_.format(**{
+                    k: '' if v is None else v
+                    for k, v in fields.items()
+                }))
+            else:
+                click.echo(json.dumps(fields, ensure_ascii=False))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
 
 
 @cli.command()
@@ -753,7 +1216,9 @@ def last(globs: ROAttrDict):
     envvar='RDIAL_RATE',
     help='Hourly rate for task output.')
 @click.pass_obj
-def ledger(globs: ROAttrDict, task: str, duration: str, rate: str):
+def ledger(globs: ROAttrDict, task: str, duration: str,
+           since: Optional[datetime.datetime],
+           until: Optional[datetime.datetime], rate: str):
     """Generate ledger compatible data file.
 
     \f
@@ -761,16 +1226,19 @@ def ledger(globs: ROAttrDict, task: str, duration: str, rate: str):
         globs: Global options object
         task: Task name to operate on
         duration: Time window to filter on
+        since: Only include events starting at or after this time
+        until: Only include events starting before this time
         rate: Rate to assign hours in report
 
     """
     if task == 'default':
         # Lazy way to remove duplicate argument definitions
         task = None
-    events = filter_events(globs, task, duration)
+    running = running_in_query(globs, task, duration, since, until)
+    events = stream_events(globs, task, duration, since, until)
 
     def gen_output():
-        if events.running():
+        if running:
             yield ';; Running event not included in output!\n'
         for event in events:
             if not event.delta:
@@ -781,7 +1249,7 @@ def ledger(globs: ROAttrDict, task: str, duration: str, rate: str):
             yield '    (task:{})  {:.2f}h{}{}\n'.format(
                 event.task, hours, ' @ {}'.format(rate) if rate else '',
                 '  ; {}'.format(event.message) if event.message else '')
-        if events.running():
+        if running:
             yield ';; Running event not included in output!\n'
 
     click.echo_via_pager(gen_output())
@@ -791,7 +1259,9 @@ def ledger(globs: ROAttrDict, task: str, duration: str, rate: str):
 @task_option
 @duration_option
 @click.pass_obj
-def timeclock(globs: ROAttrDict, task: str, duration: str):
+def timeclock(globs: ROAttrDict, task: str, duration: str,
+              since: Optional[datetime.datetime],
+              until: Optional[datetime.datetime]):
     """Generate ledger compatible timeclock file.
 
     \f
@@ -799,14 +1269,17 @@ def timeclock(globs: ROAttrDict, task: str, duration: str):
         globs: Global options object
         task: Task name to operate on
         duration: Time window to filter on
+        since: Only include events starting at or after this time
+        until: Only include events starting before this time
     """
     if task == 'default':
         # Lazy way to remove duplicate argument definitions
         task = None
-    events = filter_events(globs, task, duration)
+    running = running_in_query(globs, task, duration, since, until)
+    events = stream_events(globs, task, duration, since, until)
 
     def gen_output():
-        if events.running():
+        if running:
             yield ';; Running event not included in output!\n'
         for event in events:
             if not event.delta:
@@ -814,7 +1287,7 @@ def timeclock(globs: ROAttrDict, task: str, duration: str):
             yield f'i {event.start:%F %T} {event.task}\n'
             yield f'o {event.start + event.delta:%F %T}' \
                 f'{"  ; " + event.message if event.message else ""}\n'
-        if events.running():
+        if running:
             yield ';; Running event not included in output!\n'
 
     click.echo_via_pager(gen_output())
@@ -0,0 +1,152 @@
+#
+"""codec - Fast |ISO|-8601 handling for rdial data files."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import functools
+import re
+from typing import Optional
+
+from jnrbase import iso_8601
+
+try:
+    import cduration
+except ImportError:  # pragma: no cover
+    cduration = None
+
+#: Canonical duration format, as written by :func:`format_delta`
+DELTA_RE = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?')
+
+#: Number of distinct durations to memoize
+CACHE_SIZE = 4096
+
+
+def _slice_datetime(__string: str) -> datetime.datetime:
+    """Parse canonical datetime string by field offsets.
+
+    This is only used on Python versions without
+    :meth:`datetime.datetime.fromisoformat`.
+
+    Args:
+        __string: Datetime string without its zone designator
+
+    Returns:
+        Parsed datetime object
+
+    Raises:
+        ValueError: Non-canonical datetime string
+
+    """
+    if __string[4:5] != '-' or __string[7:8] != '-' or __string[13:14] != ':' \
+            or __string[16:17] != ':' \
+            or (len(__string) > 19 and __string[19] != '.'):
+        raise ValueError(f'Non-canonical datetime {__string!r}')
+    return datetime.datetime(
+        int(__string[:4]), int(__string[5:7]), int(__string[8:10]),
+        int(__string[11:13]), int(__string[14:16]), int(__string[17:19]),
+        int(__string[20:]) if len(__string) > 19 else 0)
+
+
+_fromisoformat = getattr(datetime.datetime, 'fromisoformat', _slice_datetime)
+
+
+def parse_datetime(__string: Optional[str]) -> datetime.datetime:
+    """Parse datetime string.
+
+    Canonical ``YYYY-MM-DDTHH:MM:SS[.ffffff]Z`` strings, as written by
+    :func:`format_datetime`, are handled directly.  Anything else is passed to
+    :func:`jnrbase.iso_8601.parse_datetime`.
+
+    Args:
+        __string: Datetime string to parse, or empty for the current time
+
+    Returns:
+        Parsed naive datetime object
+
+    """
+    if __string and len(__string) in (20, 27) and __string[-1] == 'Z' \
+            and __string[10] == 'T':
+        try:
+            return _fromisoformat(__string[:-1])
+        except ValueError:
+            pass
+    return iso_8601.parse_datetime(__string).replace(tzinfo=None)
+
+
+def format_datetime(__datetime: datetime.datetime) -> str:
+    """Format naive |UTC| datetime in canonical form.
+
+    Args:
+        __datetime: Datetime to format
+
+    Returns:
+        ``YYYY-MM-DDTHH:MM:SS[.ffffff]Z`` formatted string
+
+    """
+    return __datetime.isoformat() + 'Z'
+
+
+@functools.lru_cache(CACHE_SIZE)
+def parse_delta(__string: Optional[str]) -> datetime.timedelta:
+    """Parse duration string.
+
+    Canonical ``PnDTnHnMnS`` strings, as written by :func:`format_delta`, are
+    handled directly.  Anything else is passed to
+    :func:`cduration.parse_duration` if it is available, or
+    :func:`jnrbase.iso_8601.parse_delta` otherwise.
+
+    Results are memoized, as the same durations occur repeatedly in
+    a database.
+
+    Args:
+        __string: Duration string to parse
+
+    Returns:
+        Parsed delta object
+
+    """
+    if not __string:
+        return datetime.timedelta(0)
+    match = DELTA_RE.fullmatch(__string)
+    if match and match.lastindex:
+        days, hours, minutes, seconds = (int(group) if group else 0
+                                         for group in match.groups())
+        return datetime.timedelta(days, seconds, 0, 0, minutes, hours)
+    if cduration:
+        return cduration.parse_duration(__string)
+    return iso_8601.parse_delta(__string)
+
+
+@functools.lru_cache(CACHE_SIZE)
+def format_delta(__timedelta: datetime.timedelta) -> str:
+    """Format duration in canonical form.
+
+    This produces exactly the output of :func:`jnrbase.iso_8601.format_delta`,
+    with results memoized as the same durations occur repeatedly in
+    a database.
+
+    Args:
+        __timedelta: Duration to format
+
+    Returns:
+        ``PnDTnHnMnS`` formatted string, or an empty string for zero length
+        durations
+
+    """
+    return iso_8601.format_delta(__timedelta)
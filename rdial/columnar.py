@@ -0,0 +1,287 @@
+#
+"""columnar - Vectorised event analysis for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy
+
+from . import utils
+from .cache import DAY
+from .events import GROUP_FIELDS, Summary
+
+#: Date ordinal of the epoch
+ORDINAL = utils.EPOCH.toordinal()
+
+
+class EventArrays:
+    """Columnar container for database events.
+
+    Filters return new containers sharing no state with the original, and
+    operate on whole columns at once instead of on individual
+    :class:`~rdial.events.Event` objects.
+
+    """
+
+    def __init__(self, __tasks: List[str], __task_ids: numpy.ndarray,
+                 __starts: numpy.ndarray, __deltas: numpy.ndarray) -> None:
+        """Initialise a new ``EventArrays`` object.
+
+        Args:
+            __tasks: Task names, indexed by ``__task_ids``
+            __task_ids: Task name index for each event
+            __starts: Start time for each event in microseconds since the
+                epoch
+            __deltas: Duration of each event in microseconds
+
+        """
+        self.tasks = __tasks
+        self.task_ids = __task_ids
+        self.starts = __starts
+        self.deltas = __deltas
+        self.sorted = bool(numpy.all(__starts[1:] >= __starts[:-1]))
+
+    def __repr__(self) -> str:
+        """Self-documenting string representation.
+
+        Returns:
+            Summary of container contents
+        """
+        return f'<EventArrays {len(self)} events, {len(self.tasks)} tasks>'
+
+    def __len__(self) -> int:
+        """Count events.
+
+        Returns:
+            Number of events in container
+
+        """
+        return len(self.starts)
+
+    @staticmethod
+    def from_events(__events: Iterable) -> 'EventArrays':
+        """Convert events to columnar data.
+
+        Args:
+            __events: Events to convert
+
+        Returns:
+            Columnar events
+
+        """
+        events = list(__events)
+        tasks = sorted({event.task for event in events})
+        codes = {task: n for n, task in enumerate(tasks)}
+        task_ids = numpy.fromiter((codes[event.task] for event in events),
+                                  numpy.int32, len(events))
+        starts = numpy.fromiter((event.start_us for event in events),
+                                numpy.int64, len(events))
+        deltas = numpy.fromiter((event.delta_us for event in events),
+                                numpy.int64, len(events))
+        return EventArrays(tasks, task_ids, starts, deltas)
+
+    def select(self, __mask: numpy.ndarray) -> 'EventArrays':
+        """Select events.
+
+        Args:
+            __mask: Boolean mask, index array or slice of events to select
+
+        Returns:
+            Selected events
+
+        """
+        return EventArrays(self.tasks, self.task_ids[__mask],
+                           self.starts[__mask], self.deltas[__mask])
+
+    def for_task(self, __task: str) -> 'EventArrays':
+        """Filter events for a specific task.
+
+        Args:
+            __task: Task name to filter on
+
+        Returns:
+            Events marked with given task name
+
+        """
+        try:
+            code = self.tasks.index(__task)
+        except ValueError:
+            return self.select(slice(0, 0))
+        return self.select(self.task_ids == code)
+
+    def window(self, since: Optional[datetime.datetime] = None,
+               until: Optional[datetime.datetime] = None) -> 'EventArrays':
+        """Filter events for a time window.
+
+        Args:
+            since: Only include events starting at or after this time
+            until: Only include events starting before this time
+
+        Returns:
+            Events starting within given window
+
+        """
+        low = utils.to_epoch_us(since) if since else None
+        high = utils.to_epoch_us(until) if until else None
+        if self.sorted:
+            lo = 0 if low is None else self.starts.searchsorted(low)
+            hi = len(self) if high is None \
+                else self.starts.searchsorted(high)
+            return self.select(slice(lo, max(lo, hi)))
+        mask = numpy.ones(len(self), bool)
+        if low is not None:
+            mask &= self.starts >= low
+        if high is not None:
+            mask &= self.starts < high
+        return self.select(mask)
+
+    def for_date(self,
+                 year: int,
+                 month: Optional[int] = None,
+                 day: Optional[int] = None) -> 'EventArrays':
+        """Filter events for a specific date.
+
+        Args:
+            year: Year to filter on
+            month: Month to filter on
+            day: Day to filter on
+
+        Returns:
+            Events occurring within specified date
+
+        """
+        if month and day:
+            start = datetime.datetime(year, month, day)
+            end = start + datetime.timedelta(days=1)
+        elif month:
+            start = datetime.datetime(year, month, 1)
+            end = (start + datetime.timedelta(days=31)).replace(day=1)
+        else:
+            start = datetime.datetime(year, 1, 1)
+            end = start.replace(year=year + 1)
+        events = self.window(start, end)
+        if day and not month:
+            dates = events.starts.astype('datetime64[us]')
+            days = dates.astype('datetime64[D]') \
+                - dates.astype('datetime64[M]').astype('datetime64[D]')
+            events = events.select(days.astype(numpy.int64) == day - 1)
+        return events
+
+    def for_week(self, __year: int, __week: int) -> 'EventArrays':
+        """Filter events for a specific |ISO|-8601 week.
+
+        Args:
+            __year: Year to filter events on
+            __week: |ISO|-8601 week number to filter events on
+
+        Returns:
+            Events occurring in given |ISO|-8601 week
+        """
+        start, end = utils.iso_week_to_date(__year, __week)
+        return self.window(
+            datetime.datetime.combine(start, datetime.time()),
+            datetime.datetime.combine(end, datetime.time()))
+
+    def sum(self) -> datetime.timedelta:
+        """Sum duration of all events.
+
+        Returns:
+            Sum of all event deltas
+
+        """
+        return datetime.timedelta(microseconds=int(self.deltas.sum()))
+
+    def group_keys(self, __field: str) -> numpy.ndarray:
+        """Compute grouping key for each event.
+
+        Periods are keyed by the day number of their first day, counted from
+        the epoch.
+
+        Args:
+            __field: Field to compute keys for, from
+                :data:`~rdial.events.GROUP_FIELDS`
+
+        Returns:
+            Key for each event
+
+        Raises:
+            ValueError: Invalid grouping field
+
+        """
+        if __field not in GROUP_FIELDS:
+            raise ValueError(f'Invalid grouping field {__field!r}')
+        if __field == 'task':
+            return self.task_ids.astype(numpy.int64)
+        days = self.starts // DAY
+        if __field == 'week':
+            # The epoch was a Thursday, the fourth day of its week
+            return days - (days + 3) % 7
+        elif __field == 'month':
+            return self.starts.astype('datetime64[us]').astype(
+                'datetime64[M]').astype('datetime64[D]').astype(numpy.int64)
+        return days
+
+    def aggregate(self, *fields: str) -> Dict[Tuple, Summary]:
+        """Summarise events.
+
+        This produces the same results as
+        :meth:`~rdial.events.Events.aggregate`.
+
+        Args:
+            fields: Fields to group by, from
+                :data:`~rdial.events.GROUP_FIELDS`
+
+        Returns:
+            Summary for each group, keyed by tuples of the grouping values
+
+        Raises:
+            ValueError: Invalid grouping field
+
+        """
+        columns = [self.group_keys(field) for field in fields]
+        columns.append(numpy.zeros(len(self), numpy.int64))
+        keys = numpy.stack(columns, axis=1)
+        if not len(self):
+            return {}
+        groups, inverse = numpy.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = numpy.argsort(inverse, kind='stable')
+        bounds = numpy.flatnonzero(numpy.diff(inverse[order])) + 1
+        bounds = numpy.concatenate([[0], bounds])
+        counts = numpy.diff(numpy.concatenate([bounds, [len(self)]]))
+        totals = numpy.add.reduceat(self.deltas[order], bounds)
+        firsts = numpy.minimum.reduceat(self.starts[order], bounds)
+        lasts = numpy.maximum.reduceat(self.starts[order], bounds)
+        dates = numpy.bincount(
+            numpy.unique(
+                numpy.stack([inverse, self.starts // DAY], axis=1),
+                axis=0)[:, 0],
+            minlength=len(groups))
+        summaries = {}
+        for n, group in enumerate(groups):
+            key = tuple(
+                self.tasks[value] if field == 'task'
+                else datetime.date.fromordinal(int(value) + ORDINAL)
+                for field, value in zip(fields, group))
+            summaries[key] = Summary(
+                int(counts[n]), int(totals[n]),
+                utils.from_epoch_us(int(firsts[n])),
+                utils.from_epoch_us(int(lasts[n])), int(dates[n]))
+        return summaries
@@ -0,0 +1,169 @@
+#
+"""completion - Shell completion support for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import configparser
+import os
+from typing import Callable, Dict, List
+
+import click
+
+from . import utils
+
+#: Completion function; takes the current context and incomplete value
+Completer = Callable[[click.Context, str], List[str]]
+
+
+def read_config(__ctx: click.Context) -> configparser.ConfigParser:
+    """Read configuration for a partially parsed command line.
+
+    The main command’s callback isn’t run when completing, so the global
+    options are taken from the root context’s parameters instead.
+
+    Args:
+        __ctx: Current command context
+
+    Returns:
+        Parsed configuration data
+
+    """
+    params = __ctx.find_root().params
+    return utils.read_config(params.get('config'),
+                             {'directory': params.get('directory')})
+
+
+def _sqlite_task_names(__directory: str) -> List[str]:
+    """List task names in a SQLite database.
+
+    Args:
+        __directory: Database location
+
+    Returns:
+        Sorted task names
+
+    """
+    fname = os.path.join(__directory, 'rdial.sqlite')
+    if not os.path.exists(fname):
+        return []
+    import sqlite3
+    conn = sqlite3.connect(fname)
+    try:
+        return [
+            task for task, in conn.execute(
+                'SELECT DISTINCT task FROM events ORDER BY task')
+        ]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def task_names(__directory: str, storage: str = 'csv') -> List[str]:
+    """List task names without reading events.
+
+    Tasks that have only been started since a journal database was last
+    checkpointed are found in its journal, as they have no task data file
+    yet.
+
+    Args:
+        __directory: Database location
+        storage: Storage backend in use
+
+    Returns:
+        Sorted task names
+
+    """
+    if storage == 'sqlite':
+        return _sqlite_task_names(__directory)
+    try:
+        with os.scandir(__directory) as entries:
+            names = {
+                entry.name[:-4] for entry in entries
+                if entry.name.endswith('.csv')
+                if not entry.name.startswith('.')
+            }
+    except OSError:
+        return []
+    from . import journal
+    try:
+        names.update(entry.task for entry in journal.read(__directory))
+    except (OSError, ValueError):
+        pass
+    return sorted(names)
+
+
+def complete_tasks(__ctx: click.Context, __incomplete: str) -> List[str]:
+    """Complete task names.
+
+    Args:
+        __ctx: Current command context
+        __incomplete: Partial task name
+
+    Returns:
+        Matching task names
+
+    """
+    base = read_config(__ctx)['rdial']
+    return [
+        task for task in task_names(base['directory'], base['storage'])
+        if task.startswith(__incomplete)
+    ]
+
+
+def complete_wrappers(__ctx: click.Context,
+                      __incomplete: str) -> List[str]:
+    """Complete run wrapper names.
+
+    Args:
+        __ctx: Current command context
+        __incomplete: Partial wrapper name
+
+    Returns:
+        Matching wrapper names
+
+    """
+    cfg = read_config(__ctx)
+    if not cfg.has_section('run wrappers'):
+        return []
+    return sorted(name for name in cfg['run wrappers']
+                  if name.startswith(__incomplete)
+                  if name not in cfg.defaults())
+
+
+def completer(__func: Completer) -> Dict[str, Callable]:
+    """Build parameter arguments to attach a completion function.
+
+    :mod:`click` 8 uses ``shell_complete`` callbacks, while earlier versions
+    use ``autocompletion`` callbacks with a different signature.
+
+    Args:
+        __func: Completion function
+
+    Returns:
+        Keyword arguments for :class:`click.Parameter`
+
+    """
+    if hasattr(click.ParamType, 'shell_complete'):
+        return {
+            'shell_complete':
+            lambda ctx, param, incomplete: __func(ctx, incomplete)
+        }
+    return {
+        'autocompletion': lambda ctx, args, incomplete: __func(ctx, incomplete)
+    }
@@ -0,0 +1,157 @@
+#
+"""journal - Write-ahead journal support for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+from typing import Iterable, List, NamedTuple
+
+#: Journal file name within the database location
+FILENAME = '.journal'
+
+
+class Entry(NamedTuple):
+    """Journalled event state."""
+
+    #: Operation that produced entry; ``start`` or ``stop``
+    op: str
+    #: Task name
+    task: str
+    #: Start time in microseconds since the epoch
+    start: int
+    #: Duration in microseconds
+    delta: int
+    #: Event message
+    message: str
+
+
+def location(__directory: str) -> str:
+    """Find journal file for a database.
+
+    Args:
+        __directory: Database location
+
+    Returns:
+        Journal file location
+
+    """
+    return os.path.join(__directory, FILENAME)
+
+
+def format_entry(__entry: Entry) -> str:
+    """Format journal line.
+
+    Fields are tab separated, with the task and message |JSON| encoded so
+    they can’t contain literal tabs or newlines.
+
+    Args:
+        __entry: Entry to format
+
+    Returns:
+        Journal line
+
+    """
+    return '{}\t{}\t{:d}\t{:d}\t{}\n'.format(
+        __entry.op, json.dumps(__entry.task), __entry.start, __entry.delta,
+        json.dumps(__entry.message or ''))
+
+
+def parse_entry(__line: str) -> Entry:
+    """Parse journal line.
+
+    Args:
+        __line: Journal line to parse
+
+    Returns:
+        Parsed entry
+
+    Raises:
+        ValueError: Invalid journal line
+
+    """
+    if not __line.endswith('\n'):
+        raise ValueError(f'Incomplete journal entry {__line!r}')
+    op, task, start, delta, message = __line[:-1].split('\t')
+    if op not in ('start', 'stop'):
+        raise ValueError(f'Invalid journal operation {op!r}')
+    return Entry(op, json.loads(task), int(start), int(delta),
+                 json.loads(message))
+
+
+def read(__directory: str) -> List[Entry]:
+    """Read journal entries for a database.
+
+    An incomplete final line, as left by an interrupted append, is ignored.
+
+    Args:
+        __directory: Database location
+
+    Returns:
+        Journal entries in the order they were written
+
+    """
+    try:
+        with open(location(__directory), encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    if lines and not lines[-1].endswith('\n'):
+        lines.pop()
+    return [parse_entry(line) for line in lines]
+
+
+def append(__directory: str, __entries: Iterable[Entry]) -> int:
+    """Durably append entries to a database’s journal.
+
+    Any incomplete final line, as left by an interrupted append, is removed
+    first.
+
+    Args:
+        __directory: Database location
+        __entries: Entries to append
+
+    Returns:
+        Journal size after append
+
+    """
+    data = ''.join(format_entry(entry) for entry in __entries)
+    with open(location(__directory), 'a+b') as f:
+        size = f.tell()
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                f.seek(0)
+                f.truncate(f.read().rfind(b'\n') + 1)
+        f.write(data.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def remove(__directory: str) -> None:
+    """Remove a database’s journal, if it exists.
+
+    Args:
+        __directory: Database location
+
+    """
+    try:
+        os.unlink(location(__directory))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,175 @@
+#
+"""state - Machine readable database state for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import hashlib
+import json
+import os
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+import click
+
+from . import codec
+
+#: State file format version, bump on incompatible changes
+VERSION = 1
+
+#: State file name within the database location
+FILENAME = '.state'
+
+
+class State(NamedTuple):
+    """Summary of a database’s most recent events."""
+
+    #: Running task
+    task: Optional[str]
+    #: Start of running task
+    start: Optional[datetime.datetime]
+    #: Most recently stopped task
+    last_task: Optional[str]
+    #: Start of most recently stopped task
+    last_start: Optional[datetime.datetime]
+    #: Duration of most recently stopped task
+    last_delta: Optional[datetime.timedelta]
+    #: Message of most recently stopped task
+    last_message: Optional[str]
+    #: Number of times the state has been written
+    generation: int = 0
+
+
+def stamp(__directory: str) -> str:
+    """Fingerprint database files.
+
+    This covers task data files, the journal and the :mod:`sqlite3` database,
+    so that any modification to the database invalidates the state.
+
+    Args:
+        __directory: Database location
+
+    Returns:
+        Digest of the modification time, size and inode of database files
+
+    """
+    files = []
+    with os.scandir(__directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.csv') or entry.name in ('.journal',
+                                                             'rdial.sqlite'):
+                stat = entry.stat()
+                files.append((entry.name, stat.st_mtime_ns, stat.st_size,
+                              stat.st_ino))
+    return hashlib.blake2b(repr(sorted(files)).encode(),
+                           digest_size=16).hexdigest()
+
+
+def from_events(__events: Sequence, generation: int = 0) -> State:
+    """Summarise events.
+
+    Args:
+        __events: Events in start order
+        generation: Generation for new state
+
+    Returns:
+        State for events
+
+    """
+    running = __events[-1] if __events and __events[-1].running() else None
+    stopped = len(__events) - 1 if running else len(__events)
+    last = __events[stopped - 1] if stopped else None
+    return State(running.task if running else None,
+                 running.start if running else None,
+                 last.task if last else None, last.start if last else None,
+                 last.delta if last else None,
+                 last.message if last else None, generation)
+
+
+def read(__directory: str, validate: bool = True) -> Optional[State]:
+    """Read state file.
+
+    Args:
+        __directory: Database location
+        validate: Whether to check the state matches the database files
+
+    Returns:
+        Database state, or ``None`` if the state file is missing, unusable or
+        out of date
+
+    """
+    try:
+        with open(os.path.join(__directory, FILENAME),
+                  encoding='utf-8') as f:
+            data = json.load(f)
+        if data['version'] != VERSION \
+                or validate and data['stamp'] != stamp(__directory):
+            return None
+        last = data['last']
+        return State(
+            data['task'],
+            codec.parse_datetime(data['start']) if data['start'] else None,
+            last['task'] if last else None,
+            codec.parse_datetime(last['start']) if last else None,
+            codec.parse_delta(last['delta']) if last else None,
+            last['message'] if last else None, data['generation'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write(__directory: str, __events: Sequence) -> State:
+    """Write state file.
+
+    The file is replaced atomically, so readers never see a partial state.
+    This must be called after the events have been written, as the state
+    records the state of the database files.
+
+    Args:
+        __directory: Database location
+        __events: Events in start order
+
+    Returns:
+        Written database state
+
+    """
+    fname = os.path.join(__directory, FILENAME)
+    try:
+        with open(fname, encoding='utf-8') as f:
+            generation = json.load(f)['generation'] + 1
+    except (OSError, ValueError, KeyError, TypeError):
+        generation = 1
+    state = from_events(__events, generation)
+    last: Optional[Dict[str, Any]] = None
+    if state.last_task:
+        last = {
+            'task': state.last_task,
+            'start': codec.format_datetime(state.last_start),
+            'delta': codec.format_delta(state.last_delta),
+            'message': state.last_message or '',
+        }
+    data = {
+        'version': VERSION,
+        'generation': generation,
+        'stamp': stamp(__directory),
+        'task': state.task,
+        'start': codec.format_datetime(state.start) if state.start else None,
+        'last': last,
+    }
+    with click.open_file(fname, 'w', encoding='utf-8', atomic=True) as f:
+        json.dump(data, f, indent=4)
+        f.write('\n')
+    return state
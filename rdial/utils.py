@@ -21,7 +21,6 @@
 import configparser
 import functools
 import os
-import subprocess
 from contextlib import contextmanager
 from datetime import date, datetime, timedelta
 from typing import Callable, ContextManager, Dict, Optional, Tuple, Union
@@ -44,6 +43,11 @@ class RdialError(ValueError):
 _MAPPER = {'D': 'days', 'H': 'hours', 'M': 'minutes', 'S': 'seconds'} \
     # type : Dict[str, str]
 
+#: Reference point for integer timestamps
+EPOCH = datetime(1970, 1, 1)
+#: Resolution of integer timestamps and durations
+MICROSECOND = timedelta(microseconds=1)
+
 
 def parse_datetime_user(__string: str) -> datetime:
     """Parse datetime string from user.
@@ -61,6 +65,7 @@ def parse_datetime_user(__string: str) -> datetime:
     try:
         datetime_ = parse_datetime(__string)
     except ValueError:
+        import subprocess
         try:
             proc = subprocess.run(
                 ['date', '--utc', '--iso-8601=seconds', '-d', __string],
@@ -75,6 +80,33 @@ def parse_datetime_user(__string: str) -> datetime:
     return datetime_.replace(tzinfo=None)
 
 
+def to_epoch_us(__datetime: datetime) -> int:
+    """Convert naïve UTC datetime to integer microseconds since the epoch.
+
+    Args:
+        __datetime: Datetime to convert
+
+    Returns:
+        Microseconds since the epoch
+
+    """
+    return (__datetime - EPOCH) // MICROSECOND
+
+
+def from_epoch_us(__value: int) -> datetime:
+    """Convert integer microseconds since the epoch to naïve UTC datetime.
+
+    Args:
+        __value: Microseconds since the epoch
+
+    Returns:
+        Naïve UTC datetime
+
+    """
+    # Positional arguments avoid timedelta’s slower keyword handling
+    return EPOCH + timedelta(0, 0, __value)
+
+
 def iso_week_to_date(__year: int, __week: int) -> Tuple[date, date]:
     """Generate date range for a given |ISO|-8601 week.
 
@@ -95,6 +127,96 @@ def iso_week_to_date(__year: int, __week: int) -> Tuple[date, date]:
     return start, end
 
 
+def duration_window(__duration: str, today: Optional[date] = None
+                    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Generate time range for a report duration.
+
+    Args:
+        __duration: Time window to generate; ``all``, ``day``, ``week``,
+            ``month`` or ``year``
+        today: Date to generate window around, defaults to today
+
+    Returns:
+        Start and end of window, or ``None`` for unbounded ends
+
+    Raises:
+        ValueError: Invalid duration
+
+    """
+    if __duration == 'all':
+        return None, None
+    try:
+        window = DURATION_WINDOWS[__duration]
+    except KeyError:
+        raise ValueError(f'Invalid duration {__duration!r}')
+    start, end = window(date.today() if today is None else today)
+    return (datetime.combine(start, datetime.min.time()),
+            datetime.combine(end, datetime.min.time()))
+
+
+def day_window(__today: date) -> Tuple[date, date]:
+    """Generate date range for the day containing a date.
+
+    Args:
+        __today: Date to generate window around
+
+    Returns:
+        Start and exclusive end of window
+
+    """
+    return __today, __today + timedelta(days=1)
+
+
+def week_window(__today: date) -> Tuple[date, date]:
+    """Generate date range for the ISO week containing a date.
+
+    Args:
+        __today: Date to generate window around
+
+    Returns:
+        Start and exclusive end of window
+
+    """
+    return iso_week_to_date(*__today.isocalendar()[:2])
+
+
+def month_window(__today: date) -> Tuple[date, date]:
+    """Generate date range for the month containing a date.
+
+    Args:
+        __today: Date to generate window around
+
+    Returns:
+        Start and exclusive end of window
+
+    """
+    start = __today.replace(day=1)
+    return start, (start + timedelta(days=31)).replace(day=1)
+
+
+def year_window(__today: date) -> Tuple[date, date]:
+    """Generate date range for the year containing a date.
+
+    Args:
+        __today: Date to generate window around
+
+    Returns:
+        Start and exclusive end of window
+
+    """
+    start = __today.replace(month=1, day=1)
+    return start, start.replace(year=start.year + 1)
+
+
+#: Supported report durations, and their window generators
+DURATION_WINDOWS: Dict[str, Callable[[date], Tuple[date, date]]] = {
+    'day': day_window,
+    'week': week_window,
+    'month': month_window,
+    'year': year_window,
+}
+
+
 def read_config(user_config: Optional[str] = None,
                 cli_options: Optional[Dict[str, Union[bool, str]]] = None
                 ) -> configparser.ConfigParser:
@@ -202,6 +324,27 @@ def newer(__fname: str, __reference: str) -> bool:
     return os.stat(__fname).st_mtime > os.stat(__reference).st_mtime
 
 
+def sync_directory(__directory: str) -> None:
+    """Flush directory entries to disk.
+
+    This makes newly created files durable, which :func:`os.fsync` on the
+    file alone doesn’t guarantee.  Platforms that can’t open directories
+    are ignored.
+
+    Args:
+        __directory: Directory to flush
+
+    """
+    try:
+        fd = os.open(__directory, os.O_RDONLY)
+    except OSError:  # pragma: no cover
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 def term_link(__target: str, name: Optional[str] = None) -> str:
     """Generate a terminal hyperlink.
 
@@ -0,0 +1,261 @@
+#
+"""watcher - Follow database state changes for rdial."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import ctypes
+import ctypes.util
+import datetime
+import os
+import select
+import struct
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from . import codec, state
+
+#: :manpage:`inotify(7)` event masks for a replaced or rewritten file
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+#: :manpage:`inotify_init1(2)` flags
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+#: Header of each :manpage:`inotify(7)` event; watch descriptor, mask, cookie
+#: and name length
+EVENT_HEADER = struct.Struct('iIII')
+
+#: Output field values
+Fields = Dict[str, Union[None, int, str]]
+
+
+class WatchError(OSError):
+    """Change notification is unavailable."""
+
+
+class InotifyWatcher:
+    """State file watcher using Linux’s :manpage:`inotify(7)` interface.
+
+    The database directory is watched, rather than the state file itself, as
+    the state file is replaced on every write.
+
+    """
+
+    def __init__(self, __directory: str) -> None:
+        """Initialise a new ``InotifyWatcher`` object.
+
+        Args:
+            __directory: Database location
+
+        Raises:
+            WatchError: :manpage:`inotify(7)` is unavailable
+
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise WatchError('inotify is unavailable')
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatchError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if add_watch(self.fd, os.fsencode(__directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise WatchError(errno, f'Unable to watch {__directory!r}')
+
+    def wait(self, __timeout: Optional[float] = None) -> bool:
+        """Wait for state file to change.
+
+        Args:
+            __timeout: Maximum time to wait in seconds, or ``None`` to wait
+                indefinitely
+
+        Returns:
+            ``True`` if the state file changed
+
+        """
+        ready, _, _ = select.select([self.fd], [], [], __timeout)
+        if not ready:
+            return False
+        data = os.read(self.fd, 65536)
+        changed = False
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name == os.fsencode(state.FILENAME):
+                changed = True
+        return changed
+
+    def close(self) -> None:
+        """Release :manpage:`inotify(7)` resources."""
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """State file watcher that checks the file periodically."""
+
+    def __init__(self, __directory: str, interval: float = 1) -> None:
+        """Initialise a new ``PollingWatcher`` object.
+
+        Args:
+            __directory: Database location
+            interval: Time between checks in seconds
+
+        """
+        self.fname = os.path.join(__directory, state.FILENAME)
+        self.interval = interval
+        self.stamp = self.check()
+
+    def check(self) -> Optional[Tuple[int, int, int]]:
+        """Fetch state file’s modification time, size and inode.
+
+        Returns:
+            State file’s current state, or ``None`` if it doesn’t exist
+
+        """
+        try:
+            stat = os.stat(self.fname)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def wait(self, __timeout: Optional[float] = None) -> bool:
+        """Wait for state file to change.
+
+        Args:
+            __timeout: Maximum time to wait in seconds, or ``None`` to wait
+                indefinitely
+
+        Returns:
+            ``True`` if the state file changed
+
+        """
+        deadline = None if __timeout is None else time.monotonic() + __timeout
+        while True:
+            stamp = self.check()
+            if stamp != self.stamp:
+                self.stamp = stamp
+                return True
+            if deadline is None:
+                time.sleep(self.interval)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        """Release resources."""
+
+
+def get_watcher(__directory: str, polling: bool = False
+                ) -> Union[InotifyWatcher, PollingWatcher]:
+    """Create best available state file watcher.
+
+    Args:
+        __directory: Database location
+        polling: Whether to always poll
+
+    Returns:
+        State file watcher
+
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(__directory)
+        except WatchError:
+            pass
+    return PollingWatcher(__directory)
+
+
+def follow(__directory: str,
+           __watcher: Union[InotifyWatcher, PollingWatcher],
+           __initial: state.State,
+           tick: float = 0) -> Iterator[state.State]:
+    """Follow database state.
+
+    Only the state file is read when it changes, the database itself is never
+    read.
+
+    Args:
+        __directory: Database location
+        __watcher: State file watcher
+        __initial: Database state to start from
+        tick: Interval in seconds to repeat state while a task is running, or
+            ``0`` to only produce changes
+
+    Returns:
+        Initial state, followed by each changed state and ticks
+
+    """
+    current = __initial
+    yield current
+    deadline = None
+    while True:
+        if tick and current.task and deadline is None:
+            deadline = time.monotonic() + tick
+        timeout = None if deadline is None \
+            else max(0, deadline - time.monotonic())
+        if __watcher.wait(timeout):
+            new = state.read(__directory, validate=False)
+            if new is not None and new != current:
+                current = new
+                deadline = None
+                yield current
+        elif deadline is not None and time.monotonic() >= deadline:
+            deadline = None
+            yield current
+
+
+def fields(__state: state.State,
+           __now: Optional[datetime.datetime] = None) -> Fields:
+    """Build output fields for state.
+
+    Args:
+        __state: Database state
+        __now: Time to calculate elapsed time from, defaults to now
+
+    Returns:
+        Output field values, with times as |ISO|-8601 strings and durations in
+        seconds
+
+    """
+    if __now is None:
+        __now = datetime.datetime.utcnow()
+    return {
+        'task': __state.task,
+        'start':
+        codec.format_datetime(__state.start) if __state.start else None,
+        'elapsed':
+        int((__now - __state.start).total_seconds())
+        if __state.start else None,
+        'last_task': __state.last_task,
+        'last_delta':
+        int(__state.last_delta.total_seconds())
+        if __state.last_delta is not None else None,
+        'last_message': __state.last_message,
+        'generation': __state.generation,
+    }
@@ -0,0 +1,42 @@
+#
+"""conftest - Shared test fixtures."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+from shutil import copytree
+
+from pytest import fixture
+
+from rdial import cache
+
+
+@fixture
+def temp_user_cache(monkeypatch, tmpdir):
+    cache_dir = tmpdir.join('cache')
+    cache_dir.mkdir()
+    monkeypatch.setattr(cache.xdg_basedir, 'user_cache',
+                        lambda s: cache_dir.strpath)
+    return cache_dir
+
+
+@fixture
+def database(request, temp_user_cache, tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree(f'tests/data/{getattr(request, "param", "test")}',
+             test_dir.strpath)
+    return test_dir
@@ -0,0 +1,225 @@
+#
+"""test_cache - Test cache support."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import marshal
+from array import array
+from datetime import datetime, timedelta
+
+from pytest import mark, raises
+
+from rdial import cache
+from rdial.events import Event, Events
+
+
+def test_cache_dir(temp_user_cache):
+    location = cache.cache_dir('/some/database')
+    assert location == temp_user_cache.join('_some_database').strpath
+    assert temp_user_cache.join('CACHEDIR.TAG').exists()
+
+
+def test_cache_dir_no_create(temp_user_cache):
+    location = cache.cache_dir('/some/database', create=False)
+    assert not temp_user_cache.join('_some_database').exists()
+    assert location.endswith('_some_database')
+
+
+def test_columns():
+    events = [
+        Event('task', datetime(1970, 1, 1, 0, 0, 1), timedelta(minutes=1),
+              'message'),
+        Event('task', datetime(1970, 1, 1, 0, 1, 1, 5)),
+    ]
+    starts, deltas, messages = cache.columns(events)
+    assert list(starts) == [1_000_000, 61_000_005]
+    assert list(deltas) == [60_000_000, 0]
+    assert messages == ['message', '']
+
+
+def test_task_roundtrip(tmpdir):
+    fname = tmpdir.join('task.cache').strpath
+    events = Events.read('tests/data/test', write_cache=False).for_task('task')
+    cache.write_task(fname, cache.columns(events))
+    starts, deltas, messages = cache.read_task(fname)
+    assert list(starts) == list(cache.columns(events)[0])
+    assert list(deltas) == list(cache.columns(events)[1])
+    assert messages == ['', 'finished']
+
+
+def test_digest_blocks():
+    data = bytes(range(256)) * (cache.DIGEST_BLOCK // 128)
+    assert len(cache.digest(data)) == 2 * cache.DIGEST_SIZE
+    assert cache.digest(data + b'tail')[:2 * cache.DIGEST_SIZE] \
+        == cache.digest(data)
+    assert cache.digest(data + b'tail')[2 * cache.DIGEST_SIZE:] \
+        == cache.digest(b'tail')
+    assert cache.digest(b'') == b''
+
+
+def test_task_state(tmpdir):
+    fname = tmpdir.join('task.cache').strpath
+    columns = cache.columns(Events.read('tests/data/test', write_cache=False))
+    cache.write_task(fname, columns, 47, cache.digest(b'prefix'), (1, 2, 3))
+    state = cache.read_task_state(fname)
+    assert state.tail == 47
+    assert state.digest == cache.digest(b'prefix')
+    assert state.digest != cache.digest(b'prefiX')
+    assert state.stamp == (1, 2, 3)
+
+
+@mark.parametrize('data', [
+    b'Broken data',
+    b'',
+    marshal.dumps({'version': 1, 'events': []}),
+    marshal.dumps(['not', 'a', 'dict']),
+])
+def test_task_unusable(data: bytes, tmpdir):
+    fname = tmpdir.join('task.cache')
+    fname.write_binary(data)
+    assert cache.read_task(fname.strpath) is None
+
+
+def test_task_missing(tmpdir):
+    assert cache.read_task(tmpdir.join('task.cache').strpath) is None
+
+
+def test_scan(tmpdir):
+    tmpdir.join('task.csv').write('start,delta,message\n')
+    tmpdir.join('task.csv~').write('start,delta,message\n')
+    tmpdir.join('.hidden.csv').write('start,delta,message\n')
+    tmpdir.join('.current').write('task')
+    manifest = cache.scan(tmpdir.strpath)
+    assert list(manifest) == ['task']
+    stat = tmpdir.join('task.csv').stat()
+    assert manifest['task'] == (stat.mtime_ns, stat.size, stat.ino)
+
+
+def test_snapshot_roundtrip(tmpdir):
+    fname = tmpdir.join('index').strpath
+    snapshot = cache.Snapshot({'task': (1, 2, 3)}, ['task'],
+                              array('i', [0, 0]), array('q', [1, 2]),
+                              array('q', [3, 0]), ['message ☺', ''])
+    cache.write_snapshot(fname, snapshot)
+    read = cache.read_snapshot(fname)
+    assert read.manifest == snapshot.manifest
+    assert read.tasks == snapshot.tasks
+    assert isinstance(read.starts, memoryview)
+    for field in ['task_ids', 'starts', 'deltas', 'messages']:
+        assert list(getattr(read, field)) == list(getattr(snapshot, field))
+
+
+def test_snapshot_empty(tmpdir):
+    fname = tmpdir.join('index').strpath
+    cache.write_snapshot(fname, cache.Snapshot({}, [], [], [], [], []))
+    read = cache.read_snapshot(fname)
+    assert len(read.starts) == len(read.messages) == 0
+
+
+@mark.parametrize('data', [
+    b'',
+    b'Broken data',
+    cache.INDEX_HEADER.pack(b'RDIX', 1, 0, 0, 0, 0),
+    cache.INDEX_HEADER.pack(b'RDIX', cache.VERSION, 0, 40, 0, 40),
+    cache.INDEX_HEADER.pack(b'RDIX', cache.VERSION, 0, 40, 0, 400),
+    marshal.dumps({'version': 1, 'events': []}),
+])
+def test_snapshot_unusable(data: bytes, tmpdir):
+    fname = tmpdir.join('index')
+    fname.write_binary(data)
+    assert cache.read_snapshot(fname.strpath) is None
+
+
+def test_snapshot_missing(tmpdir):
+    assert cache.read_snapshot(tmpdir.join('index').strpath) is None
+
+
+@mark.parametrize('index, expected', [
+    (0, 'one'),
+    (-1, 'three'),
+    (slice(1, None), ['two', 'three']),
+])
+def test_messages(index, expected):
+    messages = cache.Messages(b'onetwothree', [0, 3, 6, 11])
+    assert len(messages) == 3
+    assert messages[index] == expected
+
+
+def test_messages_lazy():
+    long = 'x' * (cache.LAZY_SIZE + 1)
+    data = ('short' + long).encode()
+    messages = cache.Messages(data, [0, 5, len(data)])
+    assert messages.lazy(0) == 'short'
+    lazy = messages.lazy(1)
+    assert isinstance(lazy, cache.LazyMessage)
+    assert lazy.load() == long
+
+
+def test_messages_out_of_range():
+    with raises(IndexError):
+        cache.Messages(b'', [0])[0]
+
+
+def test_rollup():
+    days = cache.rollup([1_000_000, 2_000_000, cache.DAY + 5, -1],
+                        [60_000_000, 0, 5, 1])
+    assert days == {
+        719_163: [2, 60_000_000, 1_000_000, 2_000_000],
+        719_164: [1, 5, cache.DAY + 5, cache.DAY + 5],
+        719_162: [1, 1, -1, -1],
+    }
+
+
+@mark.parametrize('since, stale', [
+    (-1, 719_162),
+    (1_000_000, 719_163),
+    (cache.DAY + 5, 719_164),
+])
+def test_update_rollup(since: int, stale: int):
+    starts = [-1, 1_000_000, 2_000_000, cache.DAY + 5, 2 * cache.DAY]
+    deltas = [1, 60_000_000, 0, 5, 7]
+    days = cache.rollup(starts, deltas)
+    days[stale][0] += 1
+    del days[719_165]
+    assert cache.update_rollup(days, starts, deltas, since) \
+        == cache.rollup(starts, deltas)
+
+
+def test_update_rollup_preserves_history():
+    days = {719_162: [5, 5, -1, -1]}
+    assert cache.update_rollup(days, [-1, cache.DAY], [1, 2], cache.DAY) == {
+        719_162: [5, 5, -1, -1],
+        719_164: [1, 2, cache.DAY, cache.DAY],
+    }
+
+
+def test_rollup_roundtrip(tmpdir):
+    fname = tmpdir.join('task.rollup').strpath
+    rollup = cache.TaskRollup((1, 2, 3), {719_162: [1, 3, 1, 1]}, (1, 3))
+    cache.write_rollup(fname, rollup)
+    assert cache.read_rollup(fname) == rollup
+
+
+@mark.parametrize('data', [
+    b'Broken data',
+    marshal.dumps({'version': 1, 'days': {}}),
+])
+def test_rollup_unusable(data: bytes, tmpdir):
+    fname = tmpdir.join('task.rollup')
+    fname.write_binary(data)
+    assert cache.read_rollup(fname.strpath) is None
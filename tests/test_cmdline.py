@@ -18,18 +18,21 @@
 # You should have received a copy of the GNU General Public License along with
 # rdial.  If not, see <http://www.gnu.org/licenses/>.
 
+import subprocess
+import sys
 from datetime import datetime
 from shutil import copytree
-from typing import Callable, Optional
+from typing import Callable, Dict, List, Optional
 
 from click import (BadParameter, Context, Option, command, echo, option,
                    pass_context, pass_obj)
 from click.testing import CliRunner
 from pytest import fixture, mark, raises
 
-from rdial import events as events_mod
-from rdial.cmdline import (StartTimeParamType, TaskNameParamType, cli,
-                           get_stop_message, main, task_option)
+from rdial import cache as cache_mod
+from rdial.cmdline import (StartTimeParamType, TableStyleParamType,
+                           TaskNameParamType, cli, get_stop_message, main,
+                           task_option)
 from rdial.events import (Event, TaskNotExistError, TaskNotRunningError,
                           TaskRunningError)
 
@@ -38,7 +41,7 @@ from rdial.events import (Event, TaskNotExistError, TaskNotRunningError,
 def temp_user_cache(monkeypatch, tmpdir):
     cache_dir = tmpdir.join('cache')
     cache_dir.mkdir()
-    monkeypatch.setattr(events_mod.xdg_basedir, 'user_cache',
+    monkeypatch.setattr(cache_mod.xdg_basedir, 'user_cache',
                         lambda s: cache_dir.strpath)
 
 
@@ -426,6 +429,63 @@ def test_report(task):
     assert 'task    2:00:00' in result.stdout
 
 
+def test_tasks():
+    runner = CliRunner()
+    result = runner.invoke(cli, '--directory tests/data/test tasks')
+    assert result.exit_code == 0
+    lines = result.stdout.strip().splitlines()
+    assert lines[0].split() == ['task', 'events', 'time', 'first', 'last']
+    assert lines[2].split() == [
+        'task', '2', '1:00:00', '2011-05-04T08:00:00Z', '2011-05-04T09:30:00Z'
+    ]
+
+
+def test_tasks_sort_time():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, '--directory tests/data/test tasks --sort time')
+    assert result.exit_code == 0
+    assert [line.split()[0] for line in result.stdout.splitlines()[2:]] \
+        == ['task2', 'task']
+
+
+@mark.parametrize('window, expected', [
+    ('--since 2011-05-04T09:00:00Z', '1:15:00'),
+    ('--until 2011-05-04T09:00:00Z', '1:00:00'),
+    ('--since 2011-05-04T09:00:00Z --until 2011-05-04T09:20:00Z', '0:15:00'),
+    ('--duration all --since 2011-05-04T09:20:00Z', '1:00:00'),
+])
+def test_report_window(window: str, expected: str):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        f'--directory tests/data/test_not_running report --stats {window}')
+    assert result.exit_code == 0
+    assert f'Duration of events {expected}' in result.stdout
+
+
+@mark.parametrize('group_by, expected', [
+    ('day', 'task    2011-05-04  2:00:00'),
+    ('week', 'task    2011-W18  2:00:00'),
+    ('month', 'task    2011-05  2:00:00'),
+])
+def test_report_group_by(group_by: str, expected: str):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, '--directory tests/data/test_not_running report '
+        f'--group-by {group_by}')
+    assert result.exit_code == 0
+    assert expected in result.stdout.splitlines()
+
+
+def test_report_sort_time():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, '--directory tests/data/test_not_running report --sort time')
+    assert result.exit_code == 0
+    assert result.stdout.splitlines()[2].startswith('task2')
+
+
 def test_report_stats():
     runner = CliRunner()
     result = runner.invoke(
@@ -454,10 +514,10 @@ def test_report_event_running():
 @mark.parametrize('database, expected', [
     ('test', 'Task “task” started'),
     ('test_not_running', 'No task is running!'),
-])
-def test_running(database: str, expected: str):
+], indirect=['database'])
+def test_running(database, expected: str):
     runner = CliRunner()
-    result = runner.invoke(cli, f'--directory tests/data/{database} running')
+    result = runner.invoke(cli, f'--directory {database.strpath} running')
     assert result.exit_code == 0
     assert expected in result.stdout
 
@@ -466,10 +526,10 @@ def test_running(database: str, expected: str):
     ('test', 'Task task is still running'),
     ('test_no_message', 'Last task task, ran for 1:00:00'),
     ('test_not_running', 'stop message'),
-])
-def test_last(database: str, expected: str):
+], indirect=['database'])
+def test_last(database, expected: str):
     runner = CliRunner()
-    result = runner.invoke(cli, f'--directory tests/data/{database} last')
+    result = runner.invoke(cli, f'--directory {database.strpath} last')
     assert result.exit_code == 0
     assert expected in result.stdout
 
@@ -478,45 +538,83 @@ def test_last(database: str, expected: str):
     '',
     'task',
 ])
-def test_ledger(task: str):
+@mark.parametrize('database', ['test_not_running'], indirect=True)
+def test_ledger(database, task: str):
     runner = CliRunner()
     result = runner.invoke(
-        cli, f'--directory tests/data/test_not_running ledger {task}')
+        cli, f'--directory {database.strpath} ledger {task}')
     assert result.exit_code == 0
     assert '2011-05-04 * 09:30-10:30' in result.stdout
 
 
-def test_ledger_running():
+@mark.parametrize('database', ['test_not_running'], indirect=True)
+def test_ledger_until(database):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} ledger '
+        '--until 2011-05-04T09:00:00Z')
+    assert result.exit_code == 0
+    assert '2011-05-04 * 08:00-09:00' in result.stdout
+    assert '09:30-10:30' not in result.stdout
+
+
+def test_ledger_running(database):
+    runner = CliRunner()
+    result = runner.invoke(cli, f'--directory {database.strpath} ledger')
+    assert result.exit_code == 0
+    lines = result.stdout.strip().splitlines()
+    assert lines[0] == lines[-1] == ';; Running event not included in output!'
+
+
+@mark.parametrize('args', [
+    'task2',
+    '--until 2011-05-04T09:30:00Z',
+])
+def test_ledger_running_filtered(database, args: str):
     runner = CliRunner()
-    result = runner.invoke(cli, '--directory tests/data/test ledger')
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} ledger {args}')
     assert result.exit_code == 0
-    assert ';; Running event not included in output!' in result.stdout
+    assert 'Running event not included' not in result.stdout
 
 
 @mark.parametrize('task', [
     '',
     'task',
 ])
-def test_timeclock(task: str):
+@mark.parametrize('database', ['test_not_running'], indirect=True)
+def test_timeclock(database, task: str):
     runner = CliRunner()
     result = runner.invoke(
-        cli, f'--directory tests/data/test_not_running timeclock {task}')
+        cli, f'--directory {database.strpath} timeclock {task}')
     assert result.exit_code == 0
     assert 'i 2011-05-04 09:30:00 task' in result.stdout.splitlines()
     assert 'o 2011-05-04 10:30:00  ; stop message' in \
         result.stdout.splitlines()
 
 
-def test_timeclock_running():
+@mark.parametrize('database', ['test_not_running'], indirect=True)
+def test_timeclock_since(database):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} timeclock '
+        '--since 2011-05-04T09:20:00Z')
+    assert result.exit_code == 0
+    assert 'i 2011-05-04 09:15:00 task2' not in result.stdout.splitlines()
+    assert 'i 2011-05-04 09:30:00 task' in result.stdout.splitlines()
+
+
+def test_timeclock_running(database):
     runner = CliRunner()
-    result = runner.invoke(cli, '--directory tests/data/test timeclock')
+    result = runner.invoke(cli, f'--directory {database.strpath} timeclock')
     assert result.exit_code == 0
-    assert ';; Running event not included in output!' in result.stdout
+    lines = result.stdout.strip().splitlines()
+    assert lines[0] == lines[-1] == ';; Running event not included in output!'
 
 
-def test_main_wrapper(monkeypatch, capsys):
-    monkeypatch.setattr('sys.argv',
-                        ['rdial', '--directory', 'tests/data/test', 'running'])
+def test_main_wrapper(database, monkeypatch, capsys):
+    monkeypatch.setattr(
+        'sys.argv', ['rdial', '--directory', database.strpath, 'running'])
 
     def exit_mock(n):
         if n == 0:
@@ -556,3 +654,59 @@ def test_main_wrapper_informative_return_code(capsys, monkeypatch, tmpdir):
     result = main()
     assert result == 50
     assert 'Task task running for' in capsys.readouterr()[0]
+
+
+#: Modules only some commands need, which must be imported lazily
+LAZY_MODULES = [
+    'click_log', 'concurrent.futures', 'csv', 'ctypes', 'jnrbase.colourise',
+    'jnrbase.human_time', 'json', 'rdial.events', 'rdial.state',
+    'rdial.watcher', 'sqlite3', 'subprocess', 'tabulate'
+]
+
+#: Import time allowed for :mod:`rdial.cmdline`, relative to :mod:`click`
+IMPORT_BUDGET = 4
+
+
+def imported_modules(__module: str) -> List[str]:
+    code = f'import sys, {__module}; print(*sys.modules, sep="\\n")'
+    proc = subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE,
+                          check=True)
+    return proc.stdout.decode().splitlines()
+
+
+def test_lazy_imports():
+    modules = imported_modules('rdial.cmdline')
+    assert 'rdial.cmdline' in modules
+    assert [module for module in LAZY_MODULES if module in modules] == []
+
+
+def import_time(__module: str) -> int:
+    times = []
+    for _ in range(3):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                               f'import {__module}'],
+                              stderr=subprocess.PIPE,
+                              check=True)
+        cumulative: Dict[str, int] = {}
+        for line in proc.stderr.decode().splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, total, name = line[12:].split('|')
+            cumulative[name.strip()] = int(total)
+        times.append(cumulative[__module])
+    return min(times)
+
+
+def test_import_time():
+    # Relative to click, so the budget holds on slower machines too
+    assert import_time('rdial.cmdline') \
+        < import_time('click') * IMPORT_BUDGET
+
+
+def test_table_style():
+    style = TableStyleParamType()
+    assert 'simple' in style.choices
+    assert style.convert('grid', None, None) == 'grid'
+    with raises(BadParameter):
+        style.convert('invalid', None, None)
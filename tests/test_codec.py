@@ -0,0 +1,101 @@
+#
+"""test_codec - Test ISO-8601 codec."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+
+from jnrbase import iso_8601
+from pytest import mark, raises
+
+from rdial import codec
+
+
+@mark.parametrize('string, expected', [
+    ('2011-05-04T09:30:00Z', datetime(2011, 5, 4, 9, 30)),
+    ('2011-05-04T09:30:00.000250Z', datetime(2011, 5, 4, 9, 30, 0, 250)),
+    ('2011-05-04T09:30:00.250Z', datetime(2011, 5, 4, 9, 30, 0, 250_000)),
+    ('2011-05-04T09:30:00+00:00', datetime(2011, 5, 4, 9, 30)),
+    ('20110504T093000Z', datetime(2011, 5, 4, 9, 30)),
+])
+def test_parse_datetime(string: str, expected: datetime):
+    assert codec.parse_datetime(string) == expected
+    assert codec.parse_datetime(string) \
+        == iso_8601.parse_datetime(string).replace(tzinfo=None)
+
+
+@mark.parametrize('string, expected', [
+    ('2011-05-04T09:30:00Z', datetime(2011, 5, 4, 9, 30)),
+    ('2011-05-04T09:30:00.000250Z', datetime(2011, 5, 4, 9, 30, 0, 250)),
+])
+def test_parse_datetime_slicing(monkeypatch, string: str, expected: datetime):
+    monkeypatch.setattr(codec, '_fromisoformat', codec._slice_datetime)
+    assert codec.parse_datetime(string) == expected
+
+
+def test_parse_datetime_slicing_invalid():
+    with raises(ValueError, match='Non-canonical'):
+        codec._slice_datetime('2011/05/04T09:30:00')
+
+
+def test_parse_datetime_now():
+    assert codec.parse_datetime('') - datetime.utcnow() < timedelta(seconds=1)
+
+
+@mark.parametrize('string, expected', [
+    ('', timedelta(0)),
+    ('PT01H', timedelta(hours=1)),
+    ('PT1H', timedelta(hours=1)),
+    ('P3DT04H05M06S', timedelta(days=3, hours=4, minutes=5, seconds=6)),
+    ('PT35M', timedelta(minutes=35)),
+    ('P2D', timedelta(days=2)),
+    ('PT', timedelta(0)),
+])
+def test_parse_delta(string: str, expected: timedelta):
+    assert codec.parse_delta(string) == expected
+
+
+def test_parse_delta_invalid():
+    with raises(ValueError):
+        codec.parse_delta('one hour')
+
+
+def test_format_datetime():
+    dt = datetime(2011, 5, 4, 9, 30, 0, 250)
+    assert codec.format_datetime(dt) == '2011-05-04T09:30:00.000250Z'
+    assert codec.format_datetime(dt) == iso_8601.format_datetime(dt) + 'Z'
+
+
+@mark.parametrize('delta', [
+    timedelta(0),
+    timedelta(microseconds=20),
+    timedelta(hours=1),
+    timedelta(days=3, hours=4, minutes=5, seconds=6, microseconds=7),
+    timedelta(days=-1, hours=2),
+])
+def test_format_delta(delta: timedelta):
+    assert codec.format_delta(delta) == iso_8601.format_delta(delta)
+
+
+@mark.parametrize('delta', [
+    timedelta(0),
+    timedelta(hours=1),
+    timedelta(days=12, minutes=5, seconds=6),
+])
+def test_delta_roundtrip(delta: timedelta):
+    assert codec.parse_delta(codec.format_delta(delta)) == delta
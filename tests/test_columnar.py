@@ -0,0 +1,117 @@
+#
+"""test_columnar - Test columnar event support."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+from pytest import fixture, importorskip, mark, raises
+
+from rdial.events import Event, Events
+
+numpy = importorskip('numpy')
+
+
+@fixture
+def events() -> Events:
+    rand = random.Random(42)
+    start = datetime(2018, 12, 20)
+    events = Events()
+    for _ in range(500):
+        start += timedelta(minutes=rand.randrange(1, 3000))
+        delta = timedelta(seconds=rand.randrange(0, 7200))
+        events.append(Event(rand.choice(['a', 'b', 'c']), start, delta))
+        start += delta
+    return events
+
+
+def test_to_arrays(events: Events):
+    arrays = events.to_arrays()
+    assert len(arrays) == len(events)
+    assert arrays.tasks == ['a', 'b', 'c']
+    assert arrays.starts.dtype == numpy.int64
+    assert arrays.sorted
+    assert repr(arrays) == '<EventArrays 500 events, 3 tasks>'
+
+
+@mark.parametrize('task', ['a', 'c', 'missing'])
+def test_for_task(events: Events, task: str):
+    arrays = events.to_arrays().for_task(task)
+    assert len(arrays) == len(events.for_task(task))
+    assert arrays.sum() == events.for_task(task).sum()
+
+
+@mark.parametrize('date', [
+    {
+        'year': 2019
+    },
+    {
+        'year': 2019,
+        'month': 2
+    },
+    {
+        'year': 2019,
+        'month': 2,
+        'day': 14
+    },
+    {
+        'year': 2019,
+        'day': 5
+    },
+])
+@mark.parametrize('reverse', [False, True])
+def test_for_date(events: Events, date: Dict[str, int], reverse: bool):
+    if reverse:
+        events.reverse()
+    arrays = events.to_arrays()
+    assert arrays.sorted is not reverse
+    assert list(arrays.for_date(**date).starts) \
+        == list(events.for_date(**date).to_arrays().starts)
+
+
+@mark.parametrize('year, week', [
+    (2019, 1),
+    (2019, 7),
+    (2020, 1),
+])
+def test_for_week(events: Events, year: int, week: int):
+    arrays = events.to_arrays().for_week(year, week)
+    assert arrays.sum() == events.for_week(year, week).sum()
+    assert len(arrays) == len(events.for_week(year, week))
+
+
+@mark.parametrize('fields', [
+    (),
+    ('task', ),
+    ('day', ),
+    ('task', 'week'),
+    ('month', 'task'),
+])
+def test_aggregate(events: Events, fields: Tuple[str]):
+    assert events.to_arrays().aggregate(*fields) == events.aggregate(*fields)
+
+
+def test_aggregate_empty():
+    assert Events().to_arrays().aggregate('task') == {}
+
+
+def test_aggregate_invalid_field(events: Events):
+    with raises(ValueError, match="Invalid grouping field 'decade'"):
+        events.to_arrays().aggregate('decade')
@@ -0,0 +1,100 @@
+#
+"""test_completion - Test shell completion support."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import List
+
+import click
+from pytest import mark
+
+from rdial import completion
+from rdial.cmdline import cli
+from rdial.events import Events
+
+
+def context(args: List[str]) -> click.Context:
+    return cli.make_context('rdial', args, resilient_parsing=True)
+
+
+def test_task_names():
+    assert completion.task_names('tests/data/test') == ['task', 'task2']
+
+
+def test_task_names_missing_database(tmpdir):
+    assert completion.task_names(tmpdir.join('missing').strpath) == []
+
+
+def test_task_names_journal(tmpdir):
+    with Events.wrapping(tmpdir.strpath, storage='journal') as events:
+        events.start('task', new=True)
+    with Events.wrapping(tmpdir.strpath, storage='journal') as events:
+        events.stop()
+        events.start('task2', new=True)
+    assert not tmpdir.join('task2.csv').exists()
+    assert completion.task_names(tmpdir.strpath) == ['task', 'task2']
+
+
+def test_task_names_sqlite(tmpdir):
+    events = Events.read('tests/data/test', write_cache=False)
+    events.storage = 'sqlite'
+    for task in events.tasks():
+        events.dirty = task
+    events.write(tmpdir.strpath)
+    assert completion.task_names(tmpdir.strpath, 'sqlite') \
+        == ['task', 'task2']
+
+
+def test_task_names_sqlite_missing_database(tmpdir):
+    assert completion.task_names(tmpdir.strpath, 'sqlite') == []
+
+
+@mark.parametrize('incomplete, expected', [
+    ('', ['task', 'task2']),
+    ('task2', ['task2']),
+    ('x', []),
+])
+def test_complete_tasks(incomplete: str, expected: List[str]):
+    ctx = context(['--directory', 'tests/data/test', 'start'])
+    assert completion.complete_tasks(ctx, incomplete) == expected
+
+
+@mark.parametrize('incomplete, expected', [
+    ('', ['calendar', 'feeds']),
+    ('f', ['feeds']),
+    ('x', []),
+])
+def test_complete_wrappers(tmpdir, incomplete: str, expected: List[str]):
+    config = tmpdir.join('config')
+    config.write('[run wrappers]\n'
+                 "feeds = -c 'mutt -f ~/Mail/RSS2email/' procrast\n"
+                 "calendar = -c 'wyrd ~/.reminders/events' calendar\n")
+    ctx = context(['--config', config.strpath, 'wrapper'])
+    assert completion.complete_wrappers(ctx, incomplete) == expected
+
+
+def test_complete_wrappers_no_section():
+    ctx = context(['--config', 'tests/data/defaults.ini', 'wrapper'])
+    assert completion.complete_wrappers(ctx, '') == []
+
+
+def test_completer():
+    kwargs = completion.completer(lambda ctx, incomplete: [incomplete])
+    (name, func), = kwargs.items()
+    assert name in ('autocompletion', 'shell_complete')
+    assert func(None, None, 'ta') == ['ta']
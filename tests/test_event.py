@@ -18,25 +18,20 @@
 # You should have received a copy of the GNU General Public License along with
 # rdial.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 from datetime import datetime, timedelta, timezone
 from filecmp import dircmp
 from glob import glob
 from shutil import copytree
-from typing import Optional, Union
+from typing import Callable, List, Optional, Union
 
 from jnrbase.iso_8601 import parse_datetime, parse_delta
-from pytest import fixture, mark, raises
+from pytest import mark, raises
 
+from rdial import cache as cache_mod
+from rdial import codec
 from rdial import events as events_mod
-from rdial.events import Event, Events, TaskRunningError
-
-
-@fixture
-def temp_user_cache(monkeypatch, tmpdir):
-    cache_dir = tmpdir.join('cache')
-    cache_dir.mkdir()
-    monkeypatch.setattr(events_mod.xdg_basedir, 'user_cache',
-                        lambda s: cache_dir.strpath)
+from rdial.events import CSVStorage, Event, Events, TaskRunningError
 
 
 @mark.parametrize('task, start, delta, message', [
@@ -72,6 +67,23 @@ def test_event_creation_non_naive():
               None, None)
 
 
+def test_event_integer_storage():
+    event = Event('test', datetime(1970, 1, 1, 0, 0, 1, 5), timedelta(hours=1))
+    assert (event.start_us, event.delta_us) == (1_000_005, 3_600_000_000)
+    event.delta = timedelta(microseconds=7)
+    assert event.delta_us == 7
+    with raises(AttributeError):
+        event.extra = True
+
+
+def test_event_from_us():
+    event = Event.from_us(''.join(['te', 'st']), 1_000_005, 3_600_000_000,
+                          'message')
+    assert event == Event('test', datetime(1970, 1, 1, 0, 0, 1, 5),
+                          timedelta(hours=1), 'message')
+    assert event.task is Event('test').task
+
+
 def test_event_equality():
     ev1 = Event('test', datetime(2013, 2, 26, 19, 45, 14), None, None)
     ev2 = Event('test', datetime(2013, 2, 26, 19, 45, 14), None, None)
@@ -115,6 +127,33 @@ def test_read_invalid_data():
         Events.read('tests/data/faulty_csv', write_cache=False)
 
 
+@mark.parametrize('database', ['test', 'date_filtering', 'test_fsck'])
+@mark.parametrize('query', [
+    {},
+    {
+        'tasks': ['task2']
+    },
+    {
+        'since': datetime(2011, 1, 1),
+        'until': datetime(2011, 5, 4, 9, 30)
+    },
+])
+def test_iter_read_database(database: str, query: dict):
+    events = Events.iter_read('tests/data/' + database, **query)
+    assert not isinstance(events, list)
+    assert list(events) == Events.read('tests/data/' + database,
+                                       write_cache=False, **query)
+
+
+def test_iter_read_invalid_data():
+    with raises(ValueError, match='Invalid data'):
+        list(Events.iter_read('tests/data/faulty_csv'))
+
+
+def test_iter_read_non_existing_database():
+    assert list(Events.iter_read('I_NEVER_EXIST')) == []
+
+
 @mark.parametrize('database, events', [
     ('test', 3),
     ('date_filtering', 3),
@@ -214,25 +253,133 @@ def test_write_database_cache(temp_user_cache, tmpdir):
     events._dirty = events.tasks()
     events.write(tmpdir.join('database').strpath)
     cache_files = glob(
-        tmpdir.join('cache', '**', '*.pkl').strpath, recursive=True)
-    assert {f.split('/')[-1][:-4] for f in cache_files} == set(events.tasks())
+        tmpdir.join('cache', '**', '*.cache').strpath, recursive=True)
+    assert {f.split('/')[-1][:-6] for f in cache_files} == set(events.tasks())
+
+
+def test_write_database_cache_refresh(temp_user_cache, monkeypatch, tmpdir):
+    database = tmpdir.join('database')
+    copytree('tests/data/test', database.strpath)
+    with Events.wrapping(database.strpath) as events:
+        events.stop('stopped')
+        events.start('task2', new=True)
+    # Simulate coarse timestamps, which defeat the modification time check
+    for cache_file in tmpdir.join('cache').visit('*.cache'):
+        cache_file.setmtime(0)
+    monkeypatch.setattr(events_mod, '_parse_rows', None)
+    events = Events.read(database.strpath)
+    monkeypatch.undo()
+    assert events.running() == 'task2'
+    assert events == Events.read(database.strpath, write_cache=False)
+
+
+def test_read_database_cache(temp_user_cache, monkeypatch, tmpdir):
+    in_dir = 'tests/data/test'
+    events = Events.read(in_dir)
+    tmpdir.join('cache', in_dir.replace('/', '_'), 'index').remove()
+    read = set()
+    monkeypatch.setattr(cache_mod.marshal, 'load',
+                        lambda f: read.add(f.name.split('/')[-1][:-6]))
+    events = Events.read(in_dir)
+    assert read == set(events.tasks())
 
 
-def test_read_database_cache(temp_user_cache, monkeypatch):
-    read = set()
-    monkeypatch.setattr(events_mod.pickle, 'load',
-                        lambda f: read.add(f.name.split('/')[-1][:-4]))
+def test_read_database_snapshot(temp_user_cache, monkeypatch):
     in_dir = 'tests/data/test'
     events = Events.read(in_dir)
+    read = []
+    load = cache_mod.marshal.load
+    monkeypatch.setattr(
+        cache_mod.marshal, 'load',
+        lambda f: read.append(f.name.split('/')[-1]) or load(f))
+    assert Events.read(in_dir) == events
+    assert read == []
+
+
+def test_read_database_index_window(temp_user_cache, monkeypatch):
+    in_dir = 'tests/data/test'
     events = Events.read(in_dir)
-    assert read == set(events.tasks())
+    fetched = []
+    monkeypatch.setattr(cache_mod.Messages, '__getitem__',
+                        lambda self, index: fetched.append(index) or 'fetched')
+    window = Events.read(in_dir, since=events[1].start,
+                         until=events[2].start)
+    assert [(event.task, event.message) for event in window] == [
+        ('task2', 'fetched'),
+    ]
+    assert fetched == [1]
+
+
+def test_read_database_lazy_message(temp_user_cache, tmpdir):
+    test_dir = tmpdir.join('test').strpath
+    copytree('tests/data/test', test_dir)
+    with Events.wrapping(test_dir) as events:
+        events.stop('long message\n' * 10)
+        events.start('task2')
+    Events.read(test_dir)
+    events = Events.read(test_dir)
+    assert isinstance(events[-2]._message, cache_mod.LazyMessage)
+    assert events[-2].message == 'long message\n' * 10
+    assert events[-2]._message == 'long message\n' * 10
+    assert events[-1]._message == ''
+
+
+def test_read_database_snapshot_partial_update(temp_user_cache, monkeypatch,
+                                               tmpdir):
+    test_dir = tmpdir.join('test').strpath
+    copytree('tests/data/test', test_dir)
+    events = Events.read(test_dir)
+    tmpdir.join('test', 'task2.csv').setmtime(0)
+    read = []
+    read_task = events_mod._read_task
+    monkeypatch.setattr(
+        events_mod, '_read_task',
+        lambda *args, **kw: read.append(args[1]) or read_task(*args, **kw))
+    assert Events.read(test_dir) == events
+    assert read == ['task2']
+    assert Events.read(test_dir) == events
+    assert read == ['task2']
+
+
+def test_read_database_snapshot_removed_task(temp_user_cache, tmpdir):
+    test_dir = tmpdir.join('test').strpath
+    copytree('tests/data/test', test_dir)
+    Events.read(test_dir)
+    tmpdir.join('test', 'task2.csv').remove()
+    assert Events.read(test_dir).tasks() == ['task']
+
+
+@mark.parametrize('edit, parsed', [
+    (lambda rows: rows[:2] + [
+        '2011-05-04T09:30:00Z,PT30M,finished\n',
+        '2011-05-04T11:00:00Z,,\n',
+    ], 2),
+    (lambda rows: rows[:1] + ['2011-05-04T08:00:00Z,PT02H,\n'] + rows[2:], 2),
+    (lambda rows: rows[:2], 1),
+])
+def test_read_database_cache_refresh(temp_user_cache, monkeypatch, tmpdir,
+                                     edit: Callable, parsed: int):
+    database = tmpdir.join('database')
+    copytree('tests/data/test', database.strpath)
+    Events.read(database.strpath)
+    task_file = database.join('task.csv')
+    task_file.write(''.join(edit(task_file.readlines())))
+    task_file.setmtime(task_file.mtime() + 60)
+    rows = []
+    parse_rows = events_mod._parse_rows
+    monkeypatch.setattr(
+        events_mod, '_parse_rows', lambda data, *args:
+        rows.append(data.count(b'\n')) or parse_rows(data, *args))
+    events = Events.read(database.strpath)
+    assert rows == [parsed]
+    assert events == Events.read(database.strpath, write_cache=False)
 
 
 def test_read_database_cache_broken(temp_user_cache, tmpdir):
     in_dir = 'tests/data/test'
     events = Events.read(in_dir)
     cache_files = glob(
-        tmpdir.join('cache', '**', '*.pkl').strpath, recursive=True)
+        tmpdir.join('cache', '**', '*.cache').strpath, recursive=True)
     with open(cache_files[0], 'w') as f:
         f.write('Broken data')
     events2 = Events.read(in_dir)
@@ -249,8 +396,154 @@ def test_non_existing_database():
 
 
 @mark.skipif(
-    not events_mod.cduration, reason='Skipping tests for cduration fallbacks')
+    not codec.cduration, reason='Skipping tests for cduration fallbacks')
 def test_handling_of_cduration(monkeypatch):
-    monkeypatch.setattr(events_mod, 'cduration', None)
+    monkeypatch.setattr(codec, 'cduration', None)
     events = Events.read('tests/data/test', write_cache=False)
     assert events.last().message == 'finished'
+
+
+def stored(events: Events):
+    return [(event.task, event.writer()) for event in events]
+
+
+@mark.parametrize('database, operations, patched', [
+    ('test', lambda evs: evs.stop('stopped'), [True]),
+    ('test', lambda evs: (evs.stop('stopped'), evs.start('task')), [True]),
+    ('test', lambda evs: (evs.stop('stopped'), evs.start('task2')),
+     [True, True]),
+    ('test_not_running', lambda evs: evs.start('task'), [True]),
+    ('test_not_running', lambda evs: evs.stop('amended', force=True), [True]),
+    ('test_not_running', lambda evs: evs.start('new', new=True), []),
+])
+def test_write_database_patch_tail(database: str, operations: Callable,
+                                   patched: List[bool], monkeypatch, tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/' + database, test_dir.strpath)
+    events = Events.read(test_dir.strpath, backup=False, write_cache=False)
+    operations(events)
+    results = []
+    patch_tail = CSVStorage.patch_tail
+    monkeypatch.setattr(
+        CSVStorage, 'patch_tail',
+        lambda *args: results.append(patch_tail(*args)) or results[-1])
+    events.write(test_dir.strpath)
+    assert [bool(result) for result in results] == patched
+    assert stored(Events.read(test_dir.strpath,
+                              write_cache=False)) == stored(events)
+
+
+@mark.parametrize('file_format', [1, 2])
+def test_write_database_patch_cache(file_format: int, temp_user_cache,
+                                    monkeypatch, tmpdir):
+    database = tmpdir.join('database').strpath
+    # Large enough to span several digest blocks
+    events = Events([
+        Event('task', datetime(2011, 1, 1) + timedelta(hours=n),
+              timedelta(minutes=30), f'message {n}') for n in range(3000)
+    ], file_format=file_format)
+    events._dirty = {'task'}
+    events.write(database)
+    Events.read(database)
+    patch_cache = CSVStorage.patch_cache
+    results = []
+    monkeypatch.setattr(
+        CSVStorage, 'patch_cache',
+        lambda *args: results.append(patch_cache(*args)) or results[-1])
+    with Events.wrapping(database, backup=False,
+                         file_format=file_format) as events:
+        events.start('task', start=datetime(2012, 1, 1, 12))
+    with Events.wrapping(database, backup=False,
+                         file_format=file_format) as events:
+        events.stop('stopped')
+    assert len(results) == 2 and None not in results
+    monkeypatch.undo()
+    cache_file = next(tmpdir.join('cache').visit('task.cache')).strpath
+    state = cache_mod.read_task_state(cache_file)
+    data = open(f'{database}/task.csv', 'rb').read()
+    assert state.stamp == events_mod._stamp(os.stat(f'{database}/task.csv'))
+    assert state.digest == cache_mod.digest(data[:state.tail])
+    assert data[state.tail:].count(b'\n') == 1
+    expected = cache_mod.columns([])
+    events_mod._parse_rows(data[data.index(b'\n') + 1:], 'task', expected,
+                           file_format)
+    assert state.columns == expected
+
+
+def test_write_database_patch_tail_backup(monkeypatch, tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/test', test_dir.strpath)
+    events = Events.read(test_dir.strpath, write_cache=False)
+    events.stop('stopped')
+    results = []
+    patch_tail = CSVStorage.patch_tail
+    monkeypatch.setattr(
+        CSVStorage, 'patch_tail',
+        lambda *args: results.append(patch_tail(*args)) or results[-1])
+    events.write(test_dir.strpath)
+    assert [bool(result) for result in results] == [True]
+    assert test_dir.join('task.csv~').read() \
+        == open('tests/data/test/task.csv').read()
+    assert not test_dir.join('task.csv~.tmp').exists()
+    assert stored(Events.read(test_dir.strpath,
+                              write_cache=False)) == stored(events)
+
+
+def test_write_database_patch_tail_undo(monkeypatch, tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/test', test_dir.strpath)
+    events = Events.read(test_dir.strpath, backup=False, write_cache=False)
+    events.stop('stopped')
+    undo = []
+    monkeypatch.setattr(
+        events_mod.utils, 'sync_directory',
+        lambda d: undo.append(test_dir.join('.undo').read_binary()))
+    events.write(test_dir.strpath)
+    monkeypatch.undo()
+    assert test_dir.join('.undo').check() is False
+    # Simulate a crash after patching, but before the undo record is removed
+    test_dir.join('.undo').write_binary(undo[0])
+    storage = CSVStorage(test_dir.strpath, backup=False, write_cache=False)
+    assert storage.recover()
+    assert test_dir.join('.undo').check() is False
+    assert test_dir.join('task.csv').read() \
+        == open('tests/data/test/task.csv').read()
+    assert not storage.recover()
+
+
+def test_write_database_patch_tail_partial_undo(tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/test', test_dir.strpath)
+    test_dir.join('.undo').write_binary(
+        CSVStorage.UNDO_HEADER.pack(20, 200, 8) + b'task.csv')
+    events = Events.read(test_dir.strpath, write_cache=False)
+    assert test_dir.join('.undo').check() is False
+    assert events == Events.read('tests/data/test', write_cache=False)
+
+
+def test_write_database_patch_tail_mismatch(tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/test', test_dir.strpath)
+    events = Events.read(test_dir.strpath, write_cache=False)
+    events.stop('stopped')
+    test_dir.join('task.csv').write('start,delta,message\n'
+                                    '2011-05-04T08:00:00Z,PT01H,\n')
+    assert not CSVStorage(test_dir.strpath).patch_tail(
+        test_dir.join('task.csv').strpath, events.for_task('task')[1:], 0)
+    events.write(test_dir.strpath)
+    assert stored(Events.read(test_dir.strpath,
+                              write_cache=False)) == stored(events)
+
+
+def test_write_database_patch_tail_multiline_message(tmpdir):
+    test_dir = tmpdir.join('test')
+    copytree('tests/data/test', test_dir.strpath)
+    events = Events.read(test_dir.strpath, write_cache=False)
+    events.stop('line\n2011-05-04T09:30:00Z,PT01H,\n')
+    events.write(test_dir.strpath)
+    events = Events.read(test_dir.strpath, write_cache=False)
+    events.stop('amended', force=True)
+    events.write(test_dir.strpath)
+    events = Events.read(test_dir.strpath, write_cache=False)
+    assert len(events) == 3
+    assert events.last().message == 'amended'
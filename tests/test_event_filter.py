@@ -18,13 +18,14 @@
 # You should have received a copy of the GNU General Public License along with
 # rdial.  If not, see <http://www.gnu.org/licenses/>.
 
+import datetime
 from typing import Dict, List, Optional
 
 from jnrbase.attrdict import ROAttrDict
-from pytest import mark
+from pytest import mark, raises
 
 from rdial.cmdline import filter_events
-from rdial.events import Events
+from rdial.events import Event, Events, Summary
 
 
 def test_fetch_events_for_task():
@@ -61,6 +62,104 @@ def test_fetch_events_for_week():
     assert len(events.for_week(2011, 9)) == 1
 
 
+@mark.parametrize('date, expected', [
+    ({
+        'year': 2011,
+        'day': 1
+    }, 1),
+    ({
+        'year': 2011,
+        'month': 12
+    }, 0),
+])
+def test_fetch_events_for_date_unsorted(date: Dict[str, int], expected: int):
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    events.reverse()
+    assert events.starts() is None
+    assert len(events.for_date(**date)) == expected
+
+
+@mark.parametrize('since, until, expected', [
+    (None, None, 3),
+    (datetime.datetime(2011, 1, 4, 8), None, 2),
+    (None, datetime.datetime(2011, 1, 4, 8), 1),
+    (datetime.datetime(2011, 1, 4, 8), datetime.datetime(2011, 1, 4, 8), 0),
+    (datetime.datetime(2012, 1, 1), None, 0),
+])
+def test_fetch_events_window(since: Optional[datetime.datetime],
+                             until: Optional[datetime.datetime],
+                             expected: int):
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    assert len(events.window(since, until)) == expected
+
+
+def test_starts_index_rebuild():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    assert len(events.starts()) == 3
+    events.append(Event('task', datetime.datetime(2012, 1, 1)))
+    assert events.starts()[-1] == 1_325_376_000_000_000
+    assert len(events.for_date(2012)) == 1
+
+
+def test_starts_index_invalidated_in_place():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    assert events.starts() is not None
+    # Same length and final event, but no longer sorted
+    events[0] = Event('task', datetime.datetime(2011, 12, 1))
+    assert events.starts() is None
+    events.sort(key=lambda event: event.start_us)
+    assert events.starts() is not None
+
+
+def test_view_combined_filters():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    view = events.view().for_task('task').filter(
+        lambda event: event.delta_us > 0)
+    expected = [
+        event for event in events if event.task == 'task' and event.delta_us
+    ]
+    assert list(view) == expected
+    assert list(reversed(view)) == expected[::-1]
+    assert len(view) == len(expected)
+
+
+@mark.parametrize('query, expected', [
+    ({}, 3),
+    ({
+        'tasks': ['task']
+    }, 2),
+    ({
+        'tasks': ['task', 'missing']
+    }, 2),
+    ({
+        'tasks': []
+    }, 0),
+    ({
+        'since': datetime.datetime(2011, 1, 4, 8)
+    }, 2),
+    ({
+        'until': datetime.datetime(2011, 1, 4, 8)
+    }, 1),
+    ({
+        'tasks': ['task2'],
+        'since': datetime.datetime(2011, 1, 1)
+    }, 0),
+    ({
+        'since': datetime.datetime(2011, 1, 1),
+        'until': datetime.datetime(2011, 2, 1)
+    }, 1),
+])
+@mark.parametrize('write_cache', [True, False])
+def test_read_query(query: Dict, expected: int, write_cache: bool, tmpdir,
+                    monkeypatch):
+    monkeypatch.setattr('rdial.cache.xdg_basedir.user_cache',
+                        lambda s: tmpdir.strpath)
+    events = Events.read('tests/data/date_filtering', write_cache=write_cache,
+                         **query)
+    assert len(events) == expected
+    assert events == sorted(events, key=lambda e: e.start)
+
+
 @mark.parametrize('task, result', [
     (None, ['task', 'task2']),
     ('task', [
@@ -68,6 +167,99 @@ def test_fetch_events_for_week():
     ]),
 ])
 def test_filter_events_by_task(task: Optional[str], result: List[str]):
-    globs = ROAttrDict(directory='tests/data/test', cache=False)
+    globs = ROAttrDict(directory='tests/data/test', cache=False,
+                       storage='csv', executor='serial')
     evs = filter_events(globs, task)
     assert evs.tasks() == result
+
+
+@mark.parametrize('fields, expected', [
+    ((), {
+        (): Summary(3, 4_500_000_000, datetime.datetime(2010, 1, 4, 9, 15),
+                    datetime.datetime(2011, 3, 1, 9, 30), 3),
+    }),
+    (('task', ), {
+        ('task', ): Summary(2, 3_600_000_000,
+                            datetime.datetime(2011, 1, 4, 8),
+                            datetime.datetime(2011, 3, 1, 9, 30), 2),
+        ('task2', ): Summary(1, 900_000_000,
+                             datetime.datetime(2010, 1, 4, 9, 15),
+                             datetime.datetime(2010, 1, 4, 9, 15), 1),
+    }),
+    (('month', ), {
+        (datetime.date(2010, 1, 1), ): Summary(
+            1, 900_000_000, datetime.datetime(2010, 1, 4, 9, 15),
+            datetime.datetime(2010, 1, 4, 9, 15), 1),
+        (datetime.date(2011, 1, 1), ): Summary(
+            1, 3_600_000_000, datetime.datetime(2011, 1, 4, 8),
+            datetime.datetime(2011, 1, 4, 8), 1),
+        (datetime.date(2011, 3, 1), ): Summary(
+            1, 0, datetime.datetime(2011, 3, 1, 9, 30),
+            datetime.datetime(2011, 3, 1, 9, 30), 1),
+    }),
+])
+def test_aggregate(fields: List[str], expected: Dict):
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    assert events.aggregate(*fields) == expected
+
+
+@mark.parametrize('field, expected', [
+    ('day', datetime.date(2011, 3, 2)),
+    ('week', datetime.date(2011, 2, 28)),
+    ('month', datetime.date(2011, 3, 1)),
+])
+def test_aggregate_periods(field: str, expected: datetime.date):
+    events = Events([
+        Event('task', datetime.datetime(2011, 3, 2, 9),
+              datetime.timedelta(hours=1)),
+        Event('task', datetime.datetime(2011, 3, 2, 14),
+              datetime.timedelta(minutes=30)),
+    ])
+    summary = events.aggregate('task', field)[('task', expected)]
+    assert summary.count == 2
+    assert summary.duration == datetime.timedelta(hours=1, minutes=30)
+    assert summary.dates == 1
+
+
+def test_aggregate_invalid_field():
+    with raises(ValueError, match="Invalid grouping field 'decade'"):
+        Events().aggregate('decade')
+
+
+def test_view_composition():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    view = events.view().for_date(2011).for_task('task')
+    assert (view.lo, view.hi) == (1, 3)
+    assert len(view) == 2
+    assert view == events.for_date(2011).for_task('task')
+    assert view.tasks() == ['task']
+    assert view.sum() == datetime.timedelta(hours=1)
+    assert view.last() is events[-1]
+    assert view.running() == 'task'
+    assert view.aggregate('task') == events.for_task('task').aggregate('task')
+    assert repr(view) == '<EventsView [1:3] 1 predicates>'
+
+
+def test_view_empty():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    view = events.view().for_task('missing')
+    assert not view
+    assert len(view) == 0
+    assert view.last() is None
+    assert view.running() is False
+    assert view.tasks() == []
+
+
+def test_view_no_copies(monkeypatch):
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    monkeypatch.setattr(Events, '__init__', None)
+    view = events.view().for_week(2011, 9).filter(lambda e: e.running())
+    assert list(view) == [events[-1]]
+
+
+def test_view_unsorted():
+    events = Events.read('tests/data/date_filtering', write_cache=False)
+    events.reverse()
+    view = events.view().window(datetime.datetime(2011, 1, 1))
+    assert (view.lo, view.hi) == (0, 3)
+    assert len(view) == 2
@@ -0,0 +1,644 @@
+#
+"""test_event_storage - Test storage backend support."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import os
+import sqlite3
+from typing import Dict, List, Tuple
+
+from click.testing import CliRunner
+from pytest import fixture, mark, raises
+
+from rdial import cache as cache_mod
+from rdial import events as events_mod
+from rdial import journal, state
+from rdial.cmdline import cli
+from rdial.events import (CSVStorage, Events, JournalStorage, SQLiteStorage,
+                          StorageError, TaskNotExistError, get_storage)
+
+
+@fixture
+def sqlite_db(tmpdir):
+    events = Events.read('tests/data/test', write_cache=False)
+    events.storage = 'sqlite'
+    for task in events.tasks():
+        events.dirty = task
+    events.write(tmpdir.strpath)
+    return tmpdir
+
+
+def rows(directory) -> int:
+    conn = sqlite3.connect(directory.join('rdial.sqlite').strpath)
+    count = conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    conn.close()
+    return count
+
+
+@mark.parametrize('name, backend', [
+    ('csv', CSVStorage),
+    ('journal', JournalStorage),
+    ('sqlite', SQLiteStorage),
+])
+def test_get_storage(name: str, backend: type):
+    assert isinstance(get_storage(name, 'tests/data/test'), backend)
+
+
+def test_get_storage_invalid():
+    with raises(StorageError, match="Unknown storage backend 'xml'"):
+        get_storage('xml', 'tests/data/test')
+
+
+def test_get_storage_invalid_executor():
+    with raises(StorageError, match="Unknown executor 'fork'"):
+        get_storage('csv', 'tests/data/test', executor='fork')
+
+
+@mark.parametrize('executor', ['thread', 'process'])
+@mark.parametrize('query', [
+    {},
+    {
+        'tasks': ['task', 'task2']
+    },
+])
+def test_parallel_read(executor: str, query: Dict):
+    expected = Events.read('tests/data/test', write_cache=False, **query)
+    events = Events.read('tests/data/test', write_cache=False,
+                         executor=executor, **query)
+    assert events == expected
+    assert [event.start for event in events] \
+        == sorted(event.start for event in events)
+
+
+def test_sqlite_roundtrip(sqlite_db):
+    events = Events.read(sqlite_db.strpath, storage='sqlite')
+    assert events == Events.read('tests/data/test', write_cache=False)
+    assert events.storage == 'sqlite'
+    assert rows(sqlite_db) == 3
+
+
+@mark.parametrize('query, expected', [
+    ({
+        'tasks': ['task2']
+    }, ['task2']),
+    ({
+        'since': datetime.datetime(2011, 5, 4, 9)
+    }, ['task2', 'task']),
+    ({
+        'tasks': ['task'],
+        'until': datetime.datetime(2011, 5, 4, 9)
+    }, ['task']),
+    ({
+        'tasks': []
+    }, []),
+])
+def test_sqlite_query(sqlite_db, query: Dict, expected: List[str]):
+    events = Events.read(sqlite_db.strpath, storage='sqlite', **query)
+    assert [event.task for event in events] == expected
+
+
+def test_sqlite_iter_read(sqlite_db):
+    events = Events.iter_read(sqlite_db.strpath, 'sqlite',
+                              since=datetime.datetime(2011, 5, 4, 9))
+    assert [event.task for event in events] == ['task2', 'task']
+
+
+def test_sqlite_missing_database(tmpdir):
+    assert Events.read(tmpdir.strpath, storage='sqlite') == Events()
+
+
+def test_sqlite_touched_events(sqlite_db):
+    with Events.wrapping(sqlite_db.strpath, storage='sqlite') as events:
+        events.stop('stopped')
+        assert events.changes('task') == [events.last()]
+    with Events.wrapping(sqlite_db.strpath, storage='sqlite') as events:
+        events.start('task2')
+    assert rows(sqlite_db) == 4
+    events = Events.read(sqlite_db.strpath, storage='sqlite')
+    assert events[-2].message == 'stopped'
+    assert events.running() == 'task2'
+
+
+def test_sqlite_rewrite_task(sqlite_db):
+    with Events.wrapping(sqlite_db.strpath, storage='sqlite') as events:
+        del events[0]
+        events.dirty = 'task'
+        assert events.changes('task') is None
+    assert rows(sqlite_db) == 2
+
+
+def test_changes_untouched():
+    events = Events.read('tests/data/test', write_cache=False)
+    assert events.changes('task') is None
+    events.stop()
+    assert events.changes('task') == [events.last()]
+    del events.dirty
+    assert events.changes('task') is None
+
+
+def test_sqlite_cli(tmpdir):
+    runner = CliRunner()
+    args = f'--config tests/data/sqlite.ini --directory {tmpdir.strpath}'
+    result = runner.invoke(cli, f'{args} start --new task')
+    assert result.exit_code == 0
+    result = runner.invoke(cli, f'{args} stop -m finished')
+    assert result.exit_code == 0
+    result = runner.invoke(cli, f'{args} last')
+    assert 'finished' in result.stdout
+    assert tmpdir.join('rdial.sqlite').exists()
+    assert not tmpdir.join('task.csv').exists()
+
+
+def test_journal_append(database):
+    original = database.join('task.csv').read()
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.start('task2')
+    assert database.join('task.csv').read() == original
+    assert not database.join('task2.csv~').exists()
+    lines = database.join('.journal').readlines()
+    assert [line.split('\t')[0] for line in lines] == ['stop', 'start']
+    events = Events.read(database.strpath, write_cache=False)
+    assert events[-2].message == 'stopped'
+    assert events.running() == 'task2'
+
+
+def test_journal_checkpoint(database):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+    events.checkpoint(database.strpath)
+    assert not database.join('.journal').exists()
+    assert 'stopped' in database.join('task.csv').read()
+    events = Events.read(database.strpath, write_cache=False)
+    assert events.last().message == 'stopped'
+
+
+def test_journal_automatic_checkpoint(database, monkeypatch):
+    monkeypatch.setattr(JournalStorage, 'CHECKPOINT_SIZE', 1)
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+    assert not database.join('.journal').exists()
+    assert 'stopped' in database.join('task.csv').read()
+
+
+def test_journal_rewrite_folds_journal(database):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.last().message = 'edited'
+        events.dirty = 'task'
+    assert not database.join('.journal').exists()
+    events = Events.read(database.strpath, write_cache=False)
+    assert events.last().message == 'edited'
+
+
+def test_journal_replay_with_cache(database, temp_user_cache):
+    Events.read(database.strpath)
+    with Events.wrapping(database.strpath, storage='journal') as events:
+        events.stop('stopped')
+        events.start('task2', new=True)
+    assert Events.read(database.strpath) \
+        == Events.read(database.strpath, write_cache=False)
+    assert Events.read(database.strpath).running() == 'task2'
+
+
+def test_journal_query(database):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+        events.start('task2', new=True)
+    events = Events.read(database.strpath, write_cache=False,
+                         tasks=['task'])
+    assert events.tasks() == ['task']
+    assert events.last().message == 'stopped'
+    events = Events.read(database.strpath, write_cache=False,
+                         since=events.last().start)
+    assert [event.task for event in events] == ['task', 'task2']
+
+
+def test_journal_iter_read(database):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+        events.start('task2', new=True)
+    assert list(Events.iter_read(database.strpath, 'journal')) \
+        == Events.read(database.strpath, write_cache=False)
+    events = Events.iter_read(database.strpath, tasks=['task'])
+    assert [event.message for event in events][-1] == 'stopped'
+
+
+@mark.parametrize('file_format, remainder', [
+    (1, 0),
+    (2, 500_000),
+])
+def test_journal_delta_precision(database, file_format: int,
+                                 remainder: int):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal',
+                         file_format=file_format) as events:
+        events.stop('stopped')
+        events.last().delta_us = 3_600_500_000
+        events.touch(events.last())
+    entry, = journal.read(database.strpath)
+    assert entry.delta % 1_000_000 == remainder
+
+
+def test_journal_appending(database, monkeypatch):
+    with Events.wrapping(database.strpath, write_cache=False,
+                         storage='journal') as events:
+        events.stop('stopped')
+    state.write(database.strpath, events)
+    monkeypatch.setattr(JournalStorage, 'read', None)
+    with Events.appending(database.strpath, write_cache=False,
+                          storage='journal') as events:
+        assert events.partial
+        assert len(events) == 1
+        assert events.tasks() == ['task', 'task2']
+        with raises(TaskNotExistError):
+            events.start('task3')
+        events.start('task2')
+    state.write(database.strpath, events)
+    with Events.appending(database.strpath, write_cache=False,
+                          storage='journal') as events:
+        assert [event.task for event in events] == ['task', 'task2']
+        events.stop('again')
+    monkeypatch.undo()
+    events = Events.read(database.strpath, write_cache=False)
+    assert [event.message for event in events[-2:]] == ['stopped', 'again']
+
+
+def test_journal_appending_stale_state(database):
+    with Events.appending(database.strpath, write_cache=False,
+                          storage='journal') as events:
+        assert not events.partial
+        events.stop('stopped')
+    assert database.join('.journal').exists()
+
+
+def test_journal_appending_rewrite(database):
+    state.write(database.strpath,
+                Events.read(database.strpath, write_cache=False))
+    with raises(StorageError, match='most recent events'):
+        with Events.appending(database.strpath, write_cache=False,
+                              storage='journal') as events:
+            events.dirty = 'task'
+
+
+def test_journal_appending_checkpoint(database, monkeypatch):
+    monkeypatch.setattr(JournalStorage, 'CHECKPOINT_SIZE', 0)
+    state.write(database.strpath,
+                Events.read(database.strpath, write_cache=False))
+    with Events.appending(database.strpath, write_cache=False,
+                          storage='journal') as events:
+        events.stop('stopped')
+    assert not database.join('.journal').exists()
+    events = Events.read(database.strpath, write_cache=False)
+    assert len(events) == 3
+    assert events.last().message == 'stopped'
+
+
+def test_journal_cli(database):
+    runner = CliRunner()
+    args = f'--config tests/data/journal.ini --directory {database.strpath}'
+    result = runner.invoke(cli, f'{args} stop -m finished')
+    assert result.exit_code == 0
+    assert database.join('.journal').exists()
+    result = runner.invoke(cli, f'{args} checkpoint')
+    assert result.exit_code == 0
+    assert not database.join('.journal').exists()
+    assert 'finished' in database.join('task.csv').read()
+    assert state.read(database.strpath).last_message == 'finished'
+    result = runner.invoke(cli, f'{args} start task2')
+    assert result.exit_code == 0
+    assert database.join('.journal').exists()
+    assert Events.read(database.strpath).running() == 'task2'
+
+
+def test_get_storage_invalid_file_format():
+    with raises(StorageError, match='Unknown file format 3'):
+        get_storage('csv', 'tests/data/test', file_format=3)
+
+
+def test_migrate(database):
+    storage = CSVStorage(database.strpath, write_cache=False, file_format=2)
+    assert storage.migrate() == ['task', 'task2']
+    assert database.join('task.csv').readlines() == [
+        'start_us,delta_us,message\n',
+        '1304496000000000,3600000000,\n',
+        '1304501400000000,0,finished\n',
+    ]
+    assert storage.migrate() == []
+    assert Events.read(database.strpath, write_cache=False) \
+        == Events.read('tests/data/test', write_cache=False)
+
+
+def test_migrate_unsupported(sqlite_db):
+    with raises(StorageError,
+                match='doesn’t support task data file formats'):
+        get_storage('sqlite', sqlite_db.strpath, file_format=2).migrate()
+
+
+def test_mixed_formats(database):
+    CSVStorage(database.strpath, write_cache=False, file_format=2).migrate()
+    database.join('task2.csv').write('start,delta,message\n'
+                                     '2011-05-04T09:15:00Z,PT15M,\n')
+    expected = Events.read('tests/data/test', write_cache=False)
+    assert Events.read(database.strpath, write_cache=False) == expected
+    assert list(Events.iter_read(database.strpath)) == expected
+
+
+def test_v2_precision(database, monkeypatch):
+    CSVStorage(database.strpath, file_format=2).migrate()
+    patch_tail = CSVStorage.patch_tail
+    results = []
+    monkeypatch.setattr(
+        CSVStorage, 'patch_tail',
+        lambda *args: results.append(patch_tail(*args)) or results[-1])
+    with Events.wrapping(database.strpath, backup=False) as events:
+        events.stop('stopped')
+        events.start('task2')
+    assert [bool(result) for result in results] == [True, True]
+    assert events[-2].delta.microseconds
+    assert database.join('task2.csv').readlines()[-1].endswith(',0,\n')
+    assert Events.read(database.strpath, write_cache=False) == events
+    assert Events.read(database.strpath) == events
+
+
+def test_migrate_cli(database):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} migrate --format 2')
+    assert result.exit_code == 0
+    assert result.stdout == 'Converted task\nConverted task2\n'
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} migrate --format 1')
+    assert result.exit_code == 0
+    assert database.join('task.csv').read() \
+        == open('tests/data/test/task.csv').read()
+
+
+@mark.parametrize('value', ['3', 'two'])
+def test_invalid_format_config(database, tmpdir, value: str):
+    config = tmpdir.join('config')
+    config.write(f'[rdial]\nformat = {value}\n')
+    result = CliRunner().invoke(
+        cli, f'--config {config.strpath} --directory {database.strpath} '
+        'report')
+    assert result.exit_code == 2
+    assert f"Invalid ‘format’ config value '{value}'" in result.output
+    assert 'must be one of 1, 2' in result.output
+
+
+#: Use the date filtering data for the ``database`` fixture
+date_filtering = mark.parametrize('database', ['date_filtering'],
+                                  indirect=True)
+
+
+@date_filtering
+@mark.parametrize('fields, query', [
+    ((), {}),
+    (('task', ), {}),
+    (('task', 'month'), {}),
+    (('week', ), {
+        'tasks': ['task']
+    }),
+    (('task', 'day'), {
+        'since': datetime.datetime(2011, 1, 1)
+    }),
+    (('task', ), {
+        'since': datetime.datetime(2011, 1, 1),
+        'until': datetime.datetime(2012, 1, 1)
+    }),
+    (('task', ), {
+        'tasks': ['missing']
+    }),
+])
+def test_csv_aggregate(database, fields: Tuple[str], query: Dict):
+    storage = CSVStorage(database.strpath)
+    summaries, last = storage.aggregate(fields, **query)
+    events = Events.read(database.strpath, **query)
+    assert summaries == events.aggregate(*fields)
+    if events:
+        assert (last.task, last.start) == (events.last().task,
+                                           events.last().start)
+    else:
+        assert last is None
+    assert database.join('..', 'cache', database.strpath.replace('/', '_'),
+                         'task.rollup').exists()
+
+
+@date_filtering
+@mark.parametrize('query', [
+    {
+        'since': datetime.datetime(2011, 1, 1, 12)
+    },
+    {
+        'until': datetime.datetime(2011, 2, 1)
+    },
+])
+def test_csv_aggregate_unanswerable(database, query: Dict):
+    assert CSVStorage(database.strpath).aggregate(('task', ), **query) \
+        is None
+
+
+@date_filtering
+@mark.parametrize('fields', [('task', ), ('task', 'day')])
+def test_csv_aggregate_journal(database, monkeypatch, fields: Tuple[str]):
+    storage = CSVStorage(database.strpath)
+    storage.rollups()
+    with Events.wrapping(database.strpath, storage='journal') as events:
+        events.stop('stopped')
+        events.start('task2', start=events.last().start + events.last().delta)
+        events.stop('again')
+        events.start('task3', new=True)
+    expected = Events.read(database.strpath,
+                           write_cache=False).aggregate(*fields)
+    monkeypatch.setattr(CSVStorage, 'read', None)
+    summaries, last = storage.aggregate(fields)
+    assert summaries == expected
+    assert last.running() == 'task3'
+
+
+@date_filtering
+def test_csv_aggregate_journal_unfoldable(database):
+    journal.append(database.strpath, [
+        journal.Entry('stop', 'task', 1_294_128_000_000_000, 7_200_000_000,
+                      'amended'),
+    ])
+    storage = CSVStorage(database.strpath)
+    assert storage.aggregate(('task', )) is None
+    assert Events.catalog(database.strpath) \
+        == expected_catalog(database.strpath)
+
+
+def test_csv_aggregate_missing_database(tmpdir):
+    storage = CSVStorage(tmpdir.join('missing').strpath)
+    assert storage.aggregate(('task', )) == ({}, None)
+
+
+@date_filtering
+def test_rollups_write_through(database, monkeypatch):
+    storage = CSVStorage(database.strpath)
+    storage.rollups()
+    with Events.wrapping(database.strpath) as events:
+        events.stop('stopped')
+        events.start('task2', start=events.last().start + events.last().delta)
+    expected = Events.read(database.strpath,
+                           write_cache=False).aggregate('task')
+    monkeypatch.setattr(events_mod, '_update_snapshot', None)
+    summaries, last = storage.aggregate(('task', ))
+    assert summaries == expected
+    assert last.running() == 'task2'
+
+
+@date_filtering
+def test_rollups_write_only_written_task(database, monkeypatch):
+    storage = CSVStorage(database.strpath)
+    storage.rollups()
+    events = Events.read(database.strpath)
+    events.stop('stopped')
+    written = []
+    monkeypatch.setattr(
+        cache_mod, 'write_rollup',
+        lambda fname, rollup, write=cache_mod.write_rollup: written.append(
+            os.path.basename(fname)) or write(fname, rollup))
+    monkeypatch.setattr(events_mod.EventsView, 'for_task', None)
+    storage.write(events)
+    assert written == ['task.rollup']
+    expected = Events.read(database.strpath,
+                           write_cache=False).aggregate('task')
+    monkeypatch.setattr(events_mod, '_update_snapshot', None)
+    assert storage.aggregate(('task', ))[0] == expected
+
+
+@date_filtering
+def test_rollups_external_edit(database):
+    storage = CSVStorage(database.strpath)
+    storage.rollups()
+    database.join('task2.csv').remove()
+    with Events.wrapping(database.strpath) as events:
+        events.stop('stopped')
+    summaries, _ = storage.aggregate(('task', ))
+    assert list(summaries) == [('task', )]
+
+
+def expected_catalog(directory: str, storage: str = 'csv') -> Dict:
+    summaries = Events.read(directory, write_cache=False,
+                            storage=storage).aggregate('task')
+    return {key[0]: summary for key, summary in summaries.items()}
+
+
+@date_filtering
+def test_csv_catalog(database):
+    catalog = Events.catalog(database.strpath)
+    assert catalog == expected_catalog(database.strpath)
+    assert list(catalog) == sorted(catalog)
+    assert database.join('..', 'cache', database.strpath.replace('/', '_'),
+                         'catalog').exists()
+
+
+@date_filtering
+def test_csv_catalog_cached(database, monkeypatch):
+    expected = Events.catalog(database.strpath)
+    monkeypatch.setattr(CSVStorage, 'rollups', None)
+    monkeypatch.setattr(CSVStorage, 'read', None)
+    assert Events.catalog(database.strpath) == expected
+
+
+@date_filtering
+def test_csv_catalog_write_through(database, monkeypatch):
+    Events.catalog(database.strpath)
+    with Events.wrapping(database.strpath) as events:
+        events.stop('stopped')
+        events.start('task3', new=True,
+                     start=events.last().start + events.last().delta)
+    expected = expected_catalog(database.strpath)
+    monkeypatch.setattr(CSVStorage, 'rollups', None)
+    monkeypatch.setattr(CSVStorage, 'read', None)
+    assert Events.catalog(database.strpath) == expected
+    assert 'task3' in expected
+
+
+@date_filtering
+def test_csv_summaries_write_through(database, monkeypatch):
+    storage = CSVStorage(database.strpath)
+    storage.rollups()
+    Events.catalog(database.strpath)
+    events = Events.read(database.strpath)
+    events.stop('stopped')
+    scans = []
+    rolled = []
+    monkeypatch.setattr(
+        cache_mod, 'rollup',
+        lambda starts, deltas, rollup=cache_mod.rollup: rolled.append(
+            len(starts)) or rollup(starts, deltas))
+    monkeypatch.setattr(
+        cache_mod, 'scan',
+        lambda directory, scan=cache_mod.scan: scans.append(
+            directory) or scan(directory))
+    storage.write(events)
+    assert len(scans) == 1
+    assert rolled == [1]
+    expected = expected_catalog(database.strpath)
+    monkeypatch.setattr(CSVStorage, 'read', None)
+    assert Events.catalog(database.strpath) == expected
+    summaries, _ = storage.aggregate(('task', ))
+    assert {key[0]: summary
+            for key, summary in summaries.items()} == expected
+
+
+@date_filtering
+def test_csv_catalog_external_edit(database):
+    Events.catalog(database.strpath)
+    database.join('task2.csv').remove()
+    with Events.wrapping(database.strpath) as events:
+        events.stop('stopped')
+    assert list(Events.catalog(database.strpath)) == ['task']
+
+
+@date_filtering
+def test_csv_catalog_journal(database, monkeypatch):
+    Events.catalog(database.strpath)
+    with Events.wrapping(database.strpath, storage='journal') as events:
+        events.stop('stopped')
+        events.start('task3', new=True)
+    expected = expected_catalog(database.strpath, 'journal')
+    monkeypatch.setattr(CSVStorage, 'read', None)
+    assert Events.catalog(database.strpath, storage='journal') == expected
+    assert 'task3' in expected
+
+
+def test_csv_catalog_missing_database(tmpdir):
+    assert Events.catalog(tmpdir.join('missing').strpath) == {}
+
+
+def test_sqlite_catalog(sqlite_db):
+    assert Events.catalog(sqlite_db.strpath, storage='sqlite') \
+        == expected_catalog('tests/data/test')
+
+
+def test_sqlite_catalog_missing_database(tmpdir):
+    assert Events.catalog(tmpdir.strpath, storage='sqlite') == {}
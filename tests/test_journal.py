@@ -0,0 +1,83 @@
+#
+"""test_journal - Test journal support."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+from pytest import mark, raises
+
+from rdial import journal
+
+ENTRY = journal.Entry('stop', 'task\tname', 1_304_501_400_000_000,
+                      3_600_000_000, 'multi\nline “message”')
+
+
+def test_entry_roundtrip():
+    line = journal.format_entry(ENTRY)
+    assert line.count('\n') == 1
+    assert line.count('\t') == 4
+    assert journal.parse_entry(line) == ENTRY
+
+
+@mark.parametrize('line', [
+    'start\t"task"\t0\t0\t""',
+    'delete\t"task"\t0\t0\t""\n',
+    'start\t"task"\t0\t0\n',
+    'start\t"task"\tnow\t0\t""\n',
+])
+def test_parse_invalid(line: str):
+    with raises(ValueError):
+        journal.parse_entry(line)
+
+
+def test_read_missing(tmpdir):
+    assert journal.read(tmpdir.strpath) == []
+
+
+def test_append_read(tmpdir):
+    size = journal.append(tmpdir.strpath, [ENTRY, ENTRY._replace(op='start')])
+    assert size == tmpdir.join('.journal').size()
+    assert journal.read(tmpdir.strpath) == [ENTRY, ENTRY._replace(op='start')]
+
+
+def test_read_incomplete_tail(tmpdir):
+    journal.append(tmpdir.strpath, [ENTRY])
+    with tmpdir.join('.journal').open('a') as f:
+        f.write('start\t"task"\t10')
+    assert journal.read(tmpdir.strpath) == [ENTRY]
+
+
+def test_append_incomplete_tail(tmpdir):
+    journal.append(tmpdir.strpath, [ENTRY])
+    with tmpdir.join('.journal').open('a') as f:
+        f.write('start\t"task"\t10')
+    journal.append(tmpdir.strpath, [ENTRY])
+    assert journal.read(tmpdir.strpath) == [ENTRY, ENTRY]
+
+
+def test_read_corrupt(tmpdir):
+    tmpdir.join('.journal').write('garbage\n' + journal.format_entry(ENTRY))
+    with raises(ValueError):
+        journal.read(tmpdir.strpath)
+
+
+def test_remove(tmpdir):
+    journal.append(tmpdir.strpath, [ENTRY])
+    journal.remove(tmpdir.strpath)
+    assert not tmpdir.join('.journal').exists()
+    # check idempotent…
+    journal.remove(tmpdir.strpath)
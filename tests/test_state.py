@@ -0,0 +1,143 @@
+#
+"""test_state - Test machine readable database state."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from datetime import datetime, timedelta
+
+from click.testing import CliRunner
+from pytest import mark
+
+from rdial import state
+from rdial.cmdline import cli
+from rdial.events import Events
+
+
+@mark.parametrize('database, expected', [
+    ('test',
+     state.State('task', datetime(2011, 5, 4, 9, 30), 'task2',
+                 datetime(2011, 5, 4, 9, 15), timedelta(minutes=15), '')),
+    ('test_not_running',
+     state.State(None, None, 'task', datetime(2011, 5, 4, 9, 30),
+                 timedelta(hours=1), 'stop message')),
+    ('missing', state.State(None, None, None, None, None, None)),
+])
+def test_from_events(database: str, expected: state.State):
+    events = Events.read(f'tests/data/{database}', write_cache=False)
+    assert state.from_events(events) == expected
+
+
+def test_read_write(database):
+    events = Events.read(database.strpath, write_cache=False)
+    written = state.write(database.strpath, events)
+    assert written == state.from_events(events, 1)
+    assert state.read(database.strpath) == written
+
+
+def test_file_format(database):
+    state.write(database.strpath,
+                Events.read(database.strpath, write_cache=False))
+    data = json.loads(database.join(state.FILENAME).read())
+    assert data['version'] == state.VERSION
+    assert data['task'] == 'task'
+    assert data['start'] == '2011-05-04T09:30:00Z'
+    assert data['last'] == {
+        'task': 'task2',
+        'start': '2011-05-04T09:15:00Z',
+        'delta': 'PT15M',
+        'message': '',
+    }
+
+
+def test_generation(database):
+    events = Events.read(database.strpath, write_cache=False)
+    for generation in range(1, 4):
+        assert state.write(database.strpath, events).generation == generation
+
+
+def test_read_missing(database):
+    assert state.read(database.strpath) is None
+
+
+def test_read_stale(database):
+    state.write(database.strpath,
+                Events.read(database.strpath, write_cache=False))
+    database.join('task3.csv').write('start,delta,message\n')
+    assert state.read(database.strpath) is None
+
+
+def test_read_stale_unvalidated(database):
+    written = state.write(database.strpath,
+                          Events.read(database.strpath, write_cache=False))
+    database.join('task3.csv').write('start,delta,message\n')
+    assert state.read(database.strpath, validate=False) == written
+
+
+@mark.parametrize('contents', [
+    '',
+    '[]',
+    '{"version": 0}',
+])
+def test_read_invalid(database, contents: str):
+    database.join(state.FILENAME).write(contents)
+    assert state.read(database.strpath) is None
+
+
+def test_commands_write_state(database):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} switch task2 -m switched')
+    assert result.exit_code == 0
+    current = state.read(database.strpath)
+    assert current.task == 'task2'
+    assert current.last_task == 'task'
+    assert current.last_message == 'switched'
+    result = runner.invoke(cli, f'--directory {database.strpath} stop')
+    assert result.exit_code == 0
+    current = state.read(database.strpath)
+    assert current.task is None
+    assert current.last_task == 'task2'
+    assert current.generation == 2
+
+
+@mark.parametrize('command, expected', [
+    ('running', 'Task “task2” started'),
+    ('last', 'Task task2 is still running'),
+])
+def test_status_fast_path(database, monkeypatch, command: str,
+                          expected: str):
+    runner = CliRunner()
+    runner.invoke(cli, f'--directory {database.strpath} switch task2')
+    monkeypatch.setattr(Events, 'read', None)
+    result = runner.invoke(cli, f'--directory {database.strpath} {command}')
+    assert result.exit_code == 0
+    assert expected in result.stdout
+
+
+def test_status_stale(database):
+    runner = CliRunner()
+    runner.invoke(cli, f'--directory {database.strpath} stop -m stopped')
+    database.join('task.csv').write('start,delta,message\n'
+                                    '2011-05-04T10:00:00Z,PT01H,edited\n')
+    result = runner.invoke(cli, f'--directory {database.strpath} last')
+    assert result.exit_code == 0
+    assert 'edited' in result.stdout
+    current = state.read(database.strpath)
+    assert current.last_message == 'edited'
+    assert current.generation == 2
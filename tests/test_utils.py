@@ -18,14 +18,16 @@
 # You should have received a copy of the GNU General Public License along with
 # rdial.  If not, see <http://www.gnu.org/licenses/>.
 
+from datetime import date, datetime
 from time import sleep
 from typing import Dict, Optional
 
 from jnrbase.attrdict import ROAttrDict
-from pytest import mark
+from pytest import mark, raises
 
-from rdial.utils import (newer, read_config, remove_current, term_link,
-                         write_current)
+from rdial.utils import (duration_window, from_epoch_us, newer, read_config,
+                         remove_current, sync_directory, term_link,
+                         to_epoch_us, write_current)
 
 
 def test_read_config_local():
@@ -67,6 +69,12 @@ def test_newer(tmpdir):
     assert not newer(f1.strpath, f1.strpath)
 
 
+def test_sync_directory(tmpdir):
+    tmpdir.join('file').ensure()
+    sync_directory(tmpdir.strpath)
+    assert tmpdir.join('file').check()
+
+
 @mark.parametrize('target, name, result', [
     ('pypi://rdial', 'this package',
      '\x1b]8;;pypi://rdial\x07this package\x1b]8;;\x07'),
@@ -74,3 +82,31 @@ def test_newer(tmpdir):
 ])
 def test_term_link(target: str, name: Optional[str], result: str):
     assert term_link(target, name) == result
+
+
+@mark.parametrize('datetime_, value', [
+    (datetime(1970, 1, 1), 0),
+    (datetime(2011, 5, 4, 9, 30), 1_304_501_400_000_000),
+    (datetime(2019, 5, 27, 19, 55, 13, 803240), 1_558_986_913_803_240),
+    (datetime(1969, 12, 31, 23, 59, 59), -1_000_000),
+])
+def test_epoch_us(datetime_: datetime, value: int):
+    assert to_epoch_us(datetime_) == value
+    assert from_epoch_us(value) == datetime_
+
+
+@mark.parametrize('duration, start, end', [
+    ('all', None, None),
+    ('day', datetime(2019, 2, 28), datetime(2019, 3, 1)),
+    ('week', datetime(2019, 2, 25), datetime(2019, 3, 4)),
+    ('month', datetime(2019, 2, 1), datetime(2019, 3, 1)),
+    ('year', datetime(2019, 1, 1), datetime(2020, 1, 1)),
+])
+def test_duration_window(duration: str, start: Optional[datetime],
+                         end: Optional[datetime]):
+    assert duration_window(duration, date(2019, 2, 28)) == (start, end)
+
+
+def test_duration_window_invalid():
+    with raises(ValueError, match="Invalid duration 'decade'"):
+        duration_window('decade')
@@ -0,0 +1,184 @@
+#
+"""test_watcher - Test database state following."""
+# Copyright © 2019  James Rowe <jnrowe@gmail.com>
+#
+# SPDX-License-Identifier: GPL-3.0+
+#
+# This file is part of rdial.
+#
+# rdial is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# rdial is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# rdial.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional, Union
+
+from click.testing import CliRunner
+from pytest import mark, skip
+
+from rdial import state, watcher
+from rdial.cmdline import cli
+from rdial.events import Events
+
+RUNNING = state.State('task', datetime(2011, 5, 4, 9, 30), 'task2',
+                      datetime(2011, 5, 4, 9, 15), timedelta(minutes=15), '',
+                      3)
+
+
+class ScriptedWatcher:
+    def __init__(self, __changes: List[Union[bool, Callable]]) -> None:
+        self.changes = iter(__changes)
+        self.timeouts: List[Optional[float]] = []
+
+    def wait(self, __timeout: Optional[float] = None) -> bool:
+        self.timeouts.append(__timeout)
+        changed = next(self.changes)
+        if callable(changed):
+            changed = changed()
+        if not changed and __timeout:
+            time.sleep(__timeout)
+        return changed
+
+
+def stop(directory: str, message: str = 'stopped') -> None:
+    with Events.wrapping(directory) as events:
+        events.stop(message)
+    state.write(directory, events)
+
+
+def test_polling_watcher(database):
+    monitor = watcher.PollingWatcher(database.strpath, 0.01)
+    assert not monitor.wait(0.05)
+    stop(database.strpath)
+    assert monitor.wait(0.05)
+    assert not monitor.wait(0.05)
+
+
+def test_inotify_watcher(database):
+    try:
+        monitor = watcher.InotifyWatcher(database.strpath)
+    except watcher.WatchError:
+        skip('inotify unavailable')
+    try:
+        assert not monitor.wait(0.05)
+        database.join('task.csv').write('', mode='a')
+        assert not monitor.wait(0.05)
+        stop(database.strpath)
+        assert monitor.wait(0.05)
+    finally:
+        monitor.close()
+
+
+def test_inotify_watcher_missing_directory(tmpdir):
+    try:
+        watcher.InotifyWatcher(tmpdir.join('missing').strpath)
+    except watcher.WatchError:
+        pass
+    else:
+        raise AssertionError('Watch of missing directory succeeded')
+
+
+def test_get_watcher_polling(database):
+    assert isinstance(watcher.get_watcher(database.strpath, polling=True),
+                      watcher.PollingWatcher)
+
+
+def test_get_watcher_fallback(tmpdir):
+    monitor = watcher.get_watcher(tmpdir.join('missing').strpath)
+    assert isinstance(monitor, watcher.PollingWatcher)
+
+
+def test_follow_changes(database):
+    monitor = ScriptedWatcher([False, True])
+    states = watcher.follow(database.strpath, monitor, RUNNING)
+    assert next(states) == RUNNING
+    stop(database.strpath)
+    current = next(states)
+    assert current.task is None
+    assert current.last_message == 'stopped'
+    assert monitor.timeouts == [None, None]
+
+
+def test_follow_skips_unreadable(database):
+    def rewrite() -> bool:
+        stop(database.strpath)
+        return True
+
+    monitor = ScriptedWatcher([True, rewrite])
+    states = watcher.follow(database.strpath, monitor, RUNNING)
+    next(states)
+    database.join(state.FILENAME).write('')
+    assert next(states).last_message == 'stopped'
+    assert len(monitor.timeouts) == 2
+
+
+def test_follow_tick(database, monkeypatch):
+    monkeypatch.setattr(Events, 'read', None)
+    monitor = ScriptedWatcher([False, False])
+    states = watcher.follow(database.strpath, monitor, RUNNING, tick=0.01)
+    assert list(next(states) for _ in range(3)) == [RUNNING] * 3
+    assert all(0 <= timeout <= 0.01 for timeout in monitor.timeouts)
+
+
+def test_follow_no_tick_when_stopped(database):
+    stopped = RUNNING._replace(task=None, start=None)
+    monitor = ScriptedWatcher([False, True])
+    states = watcher.follow(database.strpath, monitor, stopped, tick=0.01)
+    next(states)
+    stop_state = state.write(database.strpath, [])
+    assert next(states) == stop_state
+    assert monitor.timeouts == [None, None]
+
+
+def test_fields():
+    assert watcher.fields(RUNNING, datetime(2011, 5, 4, 10, 0, 5)) == {
+        'task': 'task',
+        'start': '2011-05-04T09:30:00Z',
+        'elapsed': 1805,
+        'last_task': 'task2',
+        'last_delta': 900,
+        'last_message': '',
+        'generation': 3,
+    }
+
+
+def test_fields_stopped():
+    current = state.State(None, None, None, None, None, None)
+    assert watcher.fields(current)['elapsed'] is None
+
+
+@mark.parametrize('args, expected', [
+    ('', 'json'),
+    ('--format "{task}|{last_task}|{generation}"', 'task|task2|3'),
+])
+def test_watch_command(database, monkeypatch, args: str, expected: str):
+    def follow(directory: str, monitor, initial: state.State,
+               tick: float) -> Iterator[state.State]:
+        yield initial
+        yield RUNNING
+
+    monkeypatch.setattr(watcher, 'follow', follow)
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, f'--directory {database.strpath} watch --poll {args}')
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert len(lines) == 2
+    if expected == 'json':
+        data = json.loads(lines[1])
+        assert data.pop('elapsed') > 0
+        expected_data = watcher.fields(RUNNING)
+        del expected_data['elapsed']
+        assert data == expected_data
+    else:
+        assert lines[1] == expected